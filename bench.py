@@ -0,0 +1,310 @@
+"""
+Benchmark: build a reproducible farm of git repos and time the scan pipeline on it.
+
+    python3 bench.py [--repos N] [--depth D] [--files F] [--dirty R] [--untracked R]
+                     [--branches B] [--remote R] [--ahead R] [--behind R] [--seed S]
+                     [--farm DIR] [--keep] [--out FILE] [--compare FILE]
+
+Headless phases (discovery, status pass, change list) always run, the GUI phases
+(list_projects, build_tree, Update, check_changes, update_changes) run GitHUD under the
+Qt offscreen platform if PySide2 is installed. Results are printed and saved as JSON,
+--compare print the ratio with a previous result file.
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+import discovery
+from gitcmd import GitEngine
+from refs import RefStore
+from repostatus import RepoStatus
+from ignorefilter import IgnoreFilter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+GIT_ENV = {'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@githud',
+           'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@githud',
+           'GIT_AUTHOR_DATE': '2020-01-01T00:00:00', 'GIT_COMMITTER_DATE': '2020-01-01T00:00:00',
+           'GIT_CONFIG_NOSYSTEM': '1'}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='bench.py', description='GitHUD scan benchmark')
+    parser.add_argument('--repos', type=int, default=50, help='number of repos')
+    parser.add_argument('--depth', type=int, default=2, help='dirs between the root and a repo')
+    parser.add_argument('--files', type=int, default=50, help='committed files per repo')
+    parser.add_argument('--dirty', type=float, default=0.3, help='ratio of repos with modified files')
+    parser.add_argument('--untracked', type=float, default=0.2, help='ratio of repos with untracked files')
+    parser.add_argument('--branches', type=int, default=3, help='local branches per repo')
+    parser.add_argument('--remote', type=float, default=0.5, help='ratio of repos with a bare file:// origin')
+    parser.add_argument('--ahead', type=float, default=0.3, help='ratio of remote repos ahead of origin')
+    parser.add_argument('--behind', type=float, default=0.3, help='ratio of remote repos behind origin')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--farm', default=None, help='farm dir, reused if it exist, default a temp dir')
+    parser.add_argument('--keep', action='store_true', help='keep the temp farm')
+    parser.add_argument('--out', default=None, help='result file, default bench_<commit>.json in the current dir')
+    parser.add_argument('--compare', default=None, help='previous result file')
+    return parser.parse_args(argv)
+
+
+def git(args, cwd):
+    env = dict(os.environ)
+    env.update(GIT_ENV)
+    ret = subprocess.run(['git'] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    if ret.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed in {cwd}: {ret.stderr}")
+    return ret.stdout
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def make_repo(path, remotes, index, args, rnd):
+    """
+    One repo of the farm, its state only depend on the seed and its index
+    :return: {'dirty', 'untracked', 'remote', 'ahead', 'behind'}
+    """
+    info = {'dirty': False, 'untracked': False, 'remote': False, 'ahead': False, 'behind': False}
+    os.makedirs(path)
+    git(['init', '-q', '-b', 'main'], path)
+    for i in range(args.files):
+        write(os.path.join(path, f'src/d{i % 5}/file{i}.txt'), f'repo {index} file {i}\n' * (1 + i % 7))
+    git(['add', '-A'], path)
+    git(['commit', '-q', '-m', 'initial'], path)
+    for i in range(1, args.branches):
+        git(['branch', f'branch{i}'], path)
+
+    if rnd.random() < args.remote:
+        info['remote'] = True
+        bare = os.path.join(remotes, f'repo{index}.git')
+        git(['init', '-q', '--bare', bare], remotes)
+        git(['remote', 'add', 'origin', f'file://{bare}'], path)
+        state = rnd.random()
+        if state < args.behind:
+            # origin has a commit the local repo never fetched
+            info['behind'] = True
+            write(os.path.join(path, 'remote.txt'), 'remote\n')
+            git(['add', '-A'], path)
+            git(['commit', '-q', '-m', 'remote'], path)
+            git(['push', '-q', '-u', 'origin', 'main'], path)
+            git(['reset', '-q', '--hard', 'HEAD~1'], path)
+            git(['update-ref', 'refs/remotes/origin/main', 'HEAD'], path)
+        else:
+            git(['push', '-q', '-u', 'origin', 'main'], path)
+            if state < args.behind + args.ahead:
+                info['ahead'] = True
+                write(os.path.join(path, 'local.txt'), 'local\n')
+                git(['add', '-A'], path)
+                git(['commit', '-q', '-m', 'local'], path)
+
+    if rnd.random() < args.dirty:
+        info['dirty'] = True
+        for i in range(0, args.files, max(1, args.files // 5)):
+            with open(os.path.join(path, f'src/d{i % 5}/file{i}.txt'), 'a') as f:
+                f.write('changed\n')
+    if rnd.random() < args.untracked:
+        info['untracked'] = True
+        for i in range(args.files):
+            write(os.path.join(path, f'build/out{i % 3}/obj{i}.o'), 'obj\n')
+        write(os.path.join(path, 'notes.txt'), 'notes\n')
+    return info
+
+
+def make_farm(farm, args):
+    """
+    :return: {repo path: info}
+    """
+    rnd = random.Random(args.seed)
+    root = os.path.join(farm, 'root')
+    remotes = os.path.join(farm, 'remotes')
+    os.makedirs(root)
+    os.makedirs(remotes)
+    repos = {}
+    for i in range(args.repos):
+        groups = [f'group{rnd.randrange(4)}' for _ in range(args.depth)]
+        path = os.path.join(root, *groups, f'repo{i}')
+        repos[path] = make_repo(path, remotes, i, args, rnd)
+    with open(os.path.join(farm, 'farm.json'), 'w') as f:
+        json.dump({'params': farm_params(args), 'repos': repos}, f)
+    return repos
+
+
+def farm_params(args):
+    return {key: getattr(args, key) for key in ['repos', 'depth', 'files', 'dirty', 'untracked', 'branches',
+                                                'remote', 'ahead', 'behind', 'seed']}
+
+
+def timed(results, name, func, *args):
+    start = time.perf_counter()
+    out = func(*args)
+    results[name] = round(time.perf_counter() - start, 4)
+    return out
+
+
+def bench_headless(root, args, results):
+    engine = GitEngine(max_jobs=args.workers)
+    repo_status = RepoStatus(engine.run, RefStore(), IgnoreFilter(), None)
+    try:
+        repos = timed(results, 'discovery', discovery.find_repos, [root], None, None, False, args.workers)
+        paths = [path for i in repos.values() for path in i]
+        results['repos_found'] = len(paths)
+
+        def status_pass():
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=args.workers) as pool:
+                return list(pool.map(repo_status.get_status, paths))
+
+        statuses = timed(results, 'status_pass', status_pass)
+        results['need_pull'] = sum(1 for i in statuses if i['need_pull'])
+        results['need_push'] = sum(1 for i in statuses if i['need_push'])
+        results['need_commit'] = sum(1 for i in statuses if i['need_commit'])
+
+        def changes_pass():
+            for i in paths:
+                status = repo_status.get_work_status(i)
+                repo_status.list_changes(i, status)
+                repo_status.list_cached_changes(i, status)
+
+        timed(results, 'changes_pass', changes_pass)
+    finally:
+        engine.stop()
+
+
+def bench_gui(farm, root, args, results):
+    """
+    GitHUD phases under the offscreen platform
+    :return: False if Qt is not available
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PySide2.QtWidgets import QApplication
+        import main
+    except ImportError as e:
+        print(f"GUI phases skipped: {e}", file=sys.stderr)
+        return False
+
+    app = QApplication.instance() or QApplication([])
+    config = {'path': [root], 'user': 'bench', 'extend': 190, 'ignore': [], 'workers': args.workers,
+              'watch': False, 'status_cache': os.path.join(farm, 'status_cache.json')}
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        # no auto discovery/update: each phase is run alone
+        hud = timed(results, 'gui_init', main.GitHUD, config, False)
+
+        # list_projects: discovery, build_tree: repos added to the folder tree
+        found = {}
+        timed(results, 'list_projects', discovery.find_repos, [root], hud.exclude, hud.max_depth,
+              hud.nested_repos, hud.workers, lambda r, p: found.setdefault(r, []).extend(p))
+        timed(results, 'build_tree', hud.add_repos, found)
+
+        def update(force):
+            # the real QThread, the GUI thread keep applying the posted status meanwhile
+            hud.status_update.force = force
+            hud.status_update.start()
+            while not hud.status_update.wait(10):
+                app.processEvents()
+            hud.status_batch.flush()
+            app.processEvents()
+
+        timed(results, 'update', update, main.FULL)
+        timed(results, 'update_cached', update, main.CACHED)
+
+        # change list of the repos with changes
+        dirty = [i for i in hud.repo_items if hud.repo_items[i].need_commit]
+        results['gui_dirty_repos'] = len(dirty)
+        check = 0.0
+        fill = 0.0
+        for path in dirty:
+            hud.path = path
+            hud.section = [os.path.basename(path), path]
+            start = time.perf_counter()
+            hud.check_changes()
+            check += time.perf_counter() - start
+            start = time.perf_counter()
+            hud.update_changes()
+            app.processEvents()
+            fill += time.perf_counter() - start
+        results['check_changes'] = round(check, 4)
+        results['update_changes'] = round(fill, 4)
+
+        hud.discover.wait()
+        hud.status_update.wait()
+        hud.close()
+        hud.git_engine.stop()
+    return True
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, path):
+    with open(path, 'r') as f:
+        previous = json.load(f)
+    if previous.get('params') != results['params']:
+        print(f"warning: {path} was made with other farm params", file=sys.stderr)
+    print(f"{'phase':<16}{'before':>10}{'after':>10}{'ratio':>8}")
+    for key, value in results['results'].items():
+        old = previous.get('results', {}).get(key)
+        if type(value) is float and type(old) in (int, float) and old > 0:
+            print(f"{key:<16}{old:>10.4f}{value:>10.4f}{value / old:>8.2f}")
+
+
+def main(argv):
+    args = parse_args(argv)
+    temp = args.farm is None
+    farm = args.farm or tempfile.mkdtemp(prefix='githud_farm_')
+    root = os.path.join(farm, 'root')
+
+    results = {}
+    if not os.path.exists(os.path.join(farm, 'farm.json')):
+        timed(results, 'make_farm', make_farm, farm, args)
+
+    try:
+        bench_headless(root, args, results)
+        results['gui'] = bench_gui(farm, root, args, results)
+    finally:
+        if temp and not args.keep:
+            shutil.rmtree(farm, ignore_errors=True)
+
+    out = {
+        'commit': commit_id(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'git': subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip(),
+        'platform': platform.platform(),
+        'params': farm_params(args),
+        'results': results,
+    }
+    path = args.out or f"bench_{out['commit'] or 'local'}.json"
+    with open(path, 'w') as f:
+        json.dump(out, f, indent=2)
+
+    print(json.dumps(out['results'], indent=2))
+    print(f"saved to {path}")
+    if temp and args.keep:
+        print(f"farm kept in {farm}")
+    if args.compare is not None:
+        compare(out, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
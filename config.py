@@ -0,0 +1,26 @@
+import os
+
+from pathlib import Path
+
+from yaml import load, Loader
+
+CONFIG_PATH = os.fspath(Path(__file__).resolve().parent / "user.conf")
+
+
+def load_config(path=CONFIG_PATH):
+    """
+    Load user.conf, a default one is written if it doesn't exist
+    :return: config dict
+    """
+    if not os.path.exists(path):
+        f = open(path, 'w')
+        f.write('---\n')
+        f.write('path: [/home/path/]\n')
+        f.write('user: user\n')
+        f.write('extend: 190\n')
+        f.write('ignore: []\n')
+        f.write('workers: 8\n')
+        f.close()
+
+    with open(path, 'r') as f:
+        return load(f, Loader)
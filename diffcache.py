@@ -0,0 +1,114 @@
+import os
+
+from collections import OrderedDict
+
+# git diff arguments giving blob ids + line counts of every modified file in one call
+INDEX_ARGS = ['diff', '--raw', '--numstat', '-z', '--no-renames', '--no-abbrev']
+
+
+class DiffCache:
+    """
+    LRU of per file diff texts, bounded by the total size of the texts
+    """
+
+    def __init__(self, max_size=8 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self.data = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key):
+        if key not in self.data:
+            return None
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        if key in self.data:
+            self.size -= len(self.data.pop(key))
+        if len(value) > self.max_size:
+            return
+        self.data[key] = value
+        self.size += len(value)
+        while self.size > self.max_size:
+            _, old = self.data.popitem(last=False)
+            self.size -= len(old)
+
+
+class DiffEntry:
+    """
+    One modified file of `git diff --raw --numstat`
+    """
+
+    def __init__(self, path, src, dst):
+        self.path = path
+        self.src = src  # blob in index
+        self.dst = dst  # blob in worktree, 0000... if not hashed
+        self.added = None
+        self.deleted = None
+        self.binary = False
+
+    def key(self, repo):
+        """
+        Cache key, the worktree side is not hashed by git so its stat is used
+        """
+        try:
+            st = os.stat(os.path.join(repo, self.path))
+            stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stat = None
+        return repo, self.path, self.src, self.dst, stat
+
+
+def parse_index(data):
+    """
+    Parse `git diff --raw --numstat -z` output
+    :return: {path: DiffEntry}
+    """
+    entries = {}
+    fields = data.split('\0')
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        if field.startswith(':'):
+            # :old_mode new_mode src dst status\0path
+            meta = field.split(' ')
+            path = fields[i + 1]
+            entries[path] = DiffEntry(path, meta[2], meta[3])
+            i += 2
+            continue
+        if field != '':
+            added, deleted, path = field.split('\t', 2)
+            entry = entries.get(path)
+            if entry is not None:
+                if added == '-':
+                    entry.binary = True
+                else:
+                    entry.added = int(added)
+                    entry.deleted = int(deleted)
+        i += 1
+    return entries
+
+
+def split_diff(data):
+    """
+    Cut a `git diff` patch output in one text per file (paths must not be quoted)
+    :return: {path: diff text}
+    """
+    out = {}
+    path = None
+    lines = []
+    for line in data.splitlines(keepends=True):
+        if line.startswith('diff --git '):
+            if path is not None:
+                out[path] = ''.join(lines)
+            # diff --git a/<path> b/<path>, same path on both sides as renames are off
+            rest = line[11:].rstrip('\n')
+            path = rest[2:(len(rest) - 1) // 2]
+            lines = []
+        lines.append(line)
+    if path is not None:
+        out[path] = ''.join(lines)
+    return out
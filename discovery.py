@@ -0,0 +1,112 @@
+import os
+
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# dirs never worth walking in, can be overridden by 'exclude' in user.conf
+EXCLUDE = ['node_modules', 'venv', '.venv', '__pycache__']
+
+
+def is_excluded(entry, exclude):
+    for i in exclude:
+        if fnmatch(entry.name, i) or fnmatch(entry.path, i):
+            return True
+    return False
+
+
+def scan_dir(path, exclude, nested):
+    """
+    List one directory
+    :return: (is_repo, [sub dirs to walk])
+    """
+    is_repo = False
+    dirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                if entry.name == '.git':
+                    is_repo = True
+                elif not is_excluded(entry, exclude):
+                    dirs.append(entry.path)
+    except OSError:
+        return False, []
+
+    # a repo is a leaf unless nested repos are wanted
+    if is_repo and not nested:
+        dirs = []
+    return is_repo, dirs
+
+
+def walk(path, depth, exclude, max_depth, nested):
+    """
+    Find repos under path
+    :return: [repo path]
+    """
+    repos = []
+    stack = [(path, depth)]
+    while stack:
+        folder, d = stack.pop()
+        is_repo, dirs = scan_dir(folder, exclude, nested)
+        if is_repo:
+            repos.append(folder)
+        if max_depth is None or d < max_depth:
+            for i in dirs:
+                stack.append((i, d + 1))
+    return repos
+
+
+def find_repos(roots, exclude=None, max_depth=None, nested=False, workers=8, on_found=None):
+    """
+    Walk all roots in parallel, the first level sub dirs of each root are walked by separate workers
+    :param roots: [path]
+    :param exclude: glob patterns matched against dir names and paths, never walked
+    :param max_depth: max depth of a repo under its root, None for no limit
+    :param nested: also look for repos inside repos
+    :param on_found: optional callback(root, [repo path]) called as soon as a sub dir is walked
+    :return: {root: [repo path]}
+    """
+    if exclude is None:
+        exclude = EXCLUDE
+
+    out = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        jobs = {}
+        for root in roots:
+            out[root] = []
+            is_repo, dirs = scan_dir(root, exclude, nested)
+            if is_repo:
+                out[root].append(root)
+                if on_found is not None:
+                    on_found(root, [root])
+            if max_depth is None or max_depth > 0:
+                for i in dirs:
+                    jobs[pool.submit(walk, i, 1, exclude, max_depth, nested)] = root
+
+        for job in as_completed(jobs):
+            root = jobs[job]
+            repos = job.result()
+            out[root] += repos
+            if on_found is not None and len(repos) > 0:
+                on_found(root, repos)
+
+    return out
+
+
+def group_projects(repos):
+    """
+    Group repos by their parent dir relative to the root
+    :param repos: {root: [repo path]}
+    :return: {project: [[repo name, repo path]]}
+    """
+    projects = {}
+    for root, paths in repos.items():
+        for path in paths:
+            parent, name = os.path.split(path)
+            if parent.startswith(root):
+                project = parent[len(root):]
+            else:
+                project = parent
+            projects.setdefault(project, []).append([name, path])
+    return projects
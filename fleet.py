@@ -0,0 +1,143 @@
+import os
+import time
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# operations
+FETCH = 'fetch'
+PULL = 'pull'
+PUSH = 'push'
+
+# result states
+OK = 'ok'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class FleetResult:
+
+    def __init__(self, path, op, state, message='', cmd=''):
+        self.path = path
+        self.op = op
+        self.state = state
+        self.message = message
+        self.cmd = cmd
+        self.time = 0.0
+
+    def __repr__(self):
+        return f'FleetResult(path={self.path}, op={self.op}, state={self.state}, message={self.message})'
+
+    def line(self):
+        """
+        One line for the result list
+        """
+        text = f"{os.path.basename(self.path)}: {self.state}"
+        if self.message != '':
+            text += f" ({self.message})"
+        return text
+
+
+class Fleet:
+    """
+    Fetch, fast-forward pull or push many repos at once, at most `jobs` repos in parallel.
+
+    A repo is skipped if it has no origin remote, for pull if it has local changes (same
+    rule as GitHUD.do_pull) or a detached HEAD, for push if it has nothing to push.
+    Nothing here touch Qt, the results are given to a callback as soon as each repo is done.
+    """
+
+    def __init__(self, git, repo_status, jobs=4):
+        """
+        :param git: callable(args, path) => subprocess.CompletedProcess
+        :param repo_status: RepoStatus
+        :param jobs: repos handled in parallel
+        """
+        self.git = git
+        self.repo_status = repo_status
+        self.jobs = max(1, jobs)
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        # repos not started yet are reported as cancelled, the running ones end normally
+        self.cancelled.set()
+
+    def run(self, op, paths, on_result=None):
+        """
+        Blocking, must not be called from the GUI thread
+        :param op: FETCH, PULL or PUSH
+        :param paths: [repo path]
+        :param on_result: optional callable(FleetResult), called from the worker threads
+        :return: [FleetResult] in the order of paths
+        """
+        self.cancelled.clear()
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(self.run_repo, op, i): i for i in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = FleetResult(path, op, FAILED, str(e))
+                results[path] = result
+                if on_result is not None:
+                    on_result(result)
+        return [results[i] for i in paths]
+
+    def run_repo(self, op, path):
+        if self.cancelled.is_set():
+            return FleetResult(path, op, CANCELLED)
+
+        start = time.perf_counter()
+        result = self.apply(op, path)
+        result.time = time.perf_counter() - start
+        return result
+
+    def apply(self, op, path):
+        if self.git(['config', '--get', 'remote.origin.url'], path).returncode != 0:
+            return FleetResult(path, op, SKIPPED, 'no origin remote')
+        if op == FETCH:
+            return self.execute(op, path, ['fetch', 'origin'])
+
+        status = self.repo_status.get_work_status(path)
+        if status.branch is None:
+            return FleetResult(path, op, SKIPPED, 'detached HEAD')
+
+        if op == PULL:
+            changes = self.repo_status.list_changes(path, status)
+            if len(changes) > 0:
+                return FleetResult(path, op, SKIPPED, f'{len(changes)} local changes')
+            return self.execute(op, path, ['pull', '--ff-only', 'origin', status.branch])
+
+        if op == PUSH:
+            if status.upstream is not None and status.ahead == 0:
+                return FleetResult(path, op, SKIPPED, 'nothing to push')
+            return self.execute(op, path, ['push', 'origin', status.branch])
+
+        raise ValueError(f'unknown fleet operation {op}')
+
+    def execute(self, op, path, args):
+        ret = self.git(args, path)
+        cmd = ' '.join(['git'] + args)
+        if ret.returncode != 0:
+            lines = ret.stderr.strip().splitlines()
+            return FleetResult(path, op, FAILED, lines[0] if lines else f'exit code {ret.returncode}', cmd)
+        return FleetResult(path, op, OK, '', cmd)
+
+
+def summary(op, results):
+    """
+    :param results: [FleetResult]
+    :return: (label text, tooltip with one line per repo)
+    """
+    counts = {}
+    for i in results:
+        counts[i.state] = counts.get(i.state, 0) + 1
+    parts = [f"{counts[i]} {i}" for i in (OK, SKIPPED, FAILED, CANCELLED) if i in counts]
+    text = f"{op} {len(results)} repos: {', '.join(parts)}"
+    # failed first, then skipped, in each group by repo name
+    order = {FAILED: 0, CANCELLED: 1, SKIPPED: 2, OK: 3}
+    lines = [i.line() for i in sorted(results, key=lambda r: (order[r.state], os.path.basename(r.path).lower()))]
+    return text, text + '\n\n' + '\n'.join(lines)
@@ -0,0 +1,215 @@
+import re
+import time
+import asyncio
+import threading
+import subprocess
+
+from concurrent.futures import Future
+
+from gitprogress import parse_progress
+
+
+class GitEngine:
+    """
+    Run git commands directly (no shell) from an asyncio loop living in its own thread.
+
+    Each command is submitted with its argv and working directory and give back a
+    concurrent.futures.Future resolving to a subprocess.CompletedProcess, many commands
+    can be in flight, the ones over max_jobs are queued, and any of them can be cancelled
+    (the git process is killed). Once stopped, the commands in flight are cancelled and the
+    ones submitted later give back an already cancelled future.
+
+    With a CommandTrace every command run is recorded in it.
+    """
+
+    def __init__(self, max_jobs=8, git='git', trace=None):
+        self.git = git
+        self.max_jobs = max_jobs
+        self.trace = trace
+        self.semaphore = None
+        # free concurrency slots, only used from the loop thread
+        self.lanes = list(range(max_jobs - 1, -1, -1))
+        self.jobs = {}  # future => (cwd, submitting thread name)
+        self.lock = threading.Lock()
+        self.stopped = False
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name='GitEngine', daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, args, cwd, input=None, on_progress=None):
+        """
+        Queue a git command
+        :param args: git arguments, ex: ['commit', '-m', msg]
+        :param cwd: repository path
+        :param input: optional str sent to git stdin
+        :param on_progress: optional callable(gitprogress.Progress) called from the engine thread for
+                            each progress line of stderr (see --progress), these lines are not kept
+                            in the result stderr
+        :return: Future => subprocess.CompletedProcess(stdout & stderr as str)
+        """
+        thread = threading.current_thread().name
+        return self.start(self.execute(list(args), cwd, input, thread, on_progress), cwd, thread)
+
+    def submit_chain(self, steps, cwd):
+        """
+        Queue git commands run one after the other, the chain stop at the first failure
+        :param steps: [(args, input)]
+        :param cwd: repository path
+        :return: Future => subprocess.CompletedProcess of the last command run
+        """
+        thread = threading.current_thread().name
+        return self.start(self.execute_chain(steps, cwd, thread), cwd, thread)
+
+    def start(self, coro, cwd, thread):
+        with self.lock:
+            if self.stopped:
+                # the loop does not run anymore, the coroutine would never resolve
+                coro.close()
+                future = Future()
+                future.cancel()
+                return future
+            future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+            self.jobs[future] = (cwd, thread)
+        future.add_done_callback(self.job_done)
+        return future
+
+    def run(self, args, cwd, input=None, timeout=None):
+        """
+        Blocking version of submit(), must not be called from the GUI thread
+        :return: subprocess.CompletedProcess
+        """
+        return self.submit(args, cwd, input).result(timeout)
+
+    def job_done(self, future):
+        with self.lock:
+            self.jobs.pop(future, None)
+
+    def cancel(self, future):
+        return future.cancel()
+
+    def cancel_where(self, cwd, thread):
+        """
+        Cancel the commands a thread submitted in a repository
+        :param cwd: repository path
+        :param thread: name of the submitting thread
+        """
+        with self.lock:
+            jobs = [k for k, v in self.jobs.items() if v == (cwd, thread)]
+        for i in jobs:
+            i.cancel()
+
+    def cancel_all(self):
+        with self.lock:
+            jobs = list(self.jobs)
+        for i in jobs:
+            i.cancel()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    @property
+    def in_flight(self):
+        return len(self.jobs)
+
+    async def execute_chain(self, steps, cwd, thread):
+        ret = None
+        for args, input in steps:
+            ret = await self.execute(list(args), cwd, input, thread)
+            if ret.returncode != 0:
+                break
+        return ret
+
+    async def execute(self, args, cwd, input, thread=None, on_progress=None):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_jobs)
+
+        cmd = [self.git] + args
+        async with self.semaphore:
+            if input is not None:
+                stdin = subprocess.PIPE
+                input = input.encode()
+            else:
+                stdin = subprocess.DEVNULL
+
+            lane = self.lanes.pop()
+            start = time.perf_counter()
+            stdout = stderr = b''
+            proc = None
+            try:
+                proc = await asyncio.create_subprocess_exec(*cmd, cwd=cwd, stdin=stdin, stdout=subprocess.PIPE,
+                                                            stderr=subprocess.PIPE)
+                if on_progress is None:
+                    stdout, stderr = await proc.communicate(input)
+                else:
+                    stdout, stderr, _ = await asyncio.gather(proc.stdout.read(),
+                                                             read_progress(proc.stderr, on_progress),
+                                                             feed(proc.stdin, input))
+                    await proc.wait()
+            except asyncio.CancelledError:
+                if proc is not None and proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                raise
+            finally:
+                self.lanes.append(lane)
+                if self.trace is not None:
+                    # returncode is negative if the command was killed, None if it could not start
+                    code = proc.returncode if proc is not None else None
+                    self.trace.record(cwd, cmd, start, time.perf_counter(), thread, lane, code,
+                                      len(stdout), len(stderr))
+
+        return subprocess.CompletedProcess(cmd, proc.returncode, decode(stdout), decode(stderr))
+
+
+async def feed(stream, input):
+    if input is None:
+        return
+    stream.write(input)
+    await stream.drain()
+    stream.close()
+
+
+async def read_progress(stream, on_progress):
+    """
+    Read stderr as it come, git rewrite its progress lines with '\r'
+    :return: bytes of the lines that are not progress
+    """
+    out = []
+    pending = b''
+    while True:
+        data = await stream.read(4096)
+        if data == b'':
+            break
+        lines = re.split(b'[\r\n]', pending + data)
+        pending = lines.pop()
+        for line in lines:
+            if line == b'':
+                continue
+            progress = parse_progress(decode(line))
+            if progress is None:
+                out.append(line)
+            else:
+                on_progress(progress)
+    if pending != b'':
+        out.append(pending)
+    return b''.join(i + b'\n' for i in out)
+
+
+def decode(data):
+    # same output as subprocess.run(text=True) with universal newlines: '\r\n' and stray '\r' become '\n'
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def cmd_str(ret):
+    """
+    Command line of a finished command, used in labels tooltips
+    """
+    return ' '.join(ret.args)
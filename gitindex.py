@@ -0,0 +1,164 @@
+import os
+import mmap
+import stat
+import struct
+
+from refs import git_dir
+
+# ctime s/ns, mtime s/ns, dev, ino, mode, uid, gid, size, sha1, flags
+ENTRY = struct.Struct('>10I20sH')
+EXTENSION = struct.Struct('>4sI')
+
+# flags
+ASSUME_VALID = 0x8000
+EXTENDED = 0x4000
+STAGE = 0x3000
+NAME_MASK = 0x0fff
+# extended flags
+SKIP_WORKTREE = 0x4000
+INTENT_TO_ADD = 0x2000
+
+# extensions this reader can't handle: split index, sparse index
+UNSUPPORTED = {b'link', b'sdir'}
+
+TRAILER = 20
+
+# mode of submodules
+GITLINK = 0o160000
+
+
+def read_entries(data):
+    """
+    Parse a .git/index, version 2 to 4, sha1 repos only
+    :param data: bytes like (mmap)
+    :return: generator of (path, mtime s, mtime ns, mode, size, flags, extended flags)
+    """
+    if len(data) < 12 + TRAILER or data[:4] != b'DIRC':
+        raise ValueError('not an index file')
+    version, count = struct.unpack_from('>II', data, 4)
+    if version not in (2, 3, 4):
+        raise ValueError(f'index version {version} not supported')
+
+    end = len(data) - TRAILER
+    pos = 12
+    name = b''
+    for _ in range(count):
+        if pos + ENTRY.size > end:
+            raise ValueError('truncated index')
+        fields = ENTRY.unpack_from(data, pos)
+        mtime, mtime_ns, mode, size, flags = fields[2], fields[3], fields[6], fields[9], fields[11]
+        start = pos
+        pos += ENTRY.size
+        extended = 0
+        if flags & EXTENDED:
+            if version < 3:
+                raise ValueError('extended flag in a v2 index')
+            extended = struct.unpack_from('>H', data, pos)[0]
+            pos += 2
+
+        if version == 4:
+            # prefix compressed: number of bytes to strip from the previous name, then the suffix
+            c = data[pos]
+            pos += 1
+            strip = c & 127
+            while c & 128:
+                c = data[pos]
+                pos += 1
+                strip = ((strip + 1) << 7) | (c & 127)
+            nul = data.find(b'\0', pos, end)
+            if nul < 0 or strip > len(name):
+                raise ValueError('corrupted index entry')
+            name = name[:len(name) - strip] + data[pos:nul]
+            pos = nul + 1
+        else:
+            length = flags & NAME_MASK
+            if length == NAME_MASK:
+                nul = data.find(b'\0', pos, end)
+                if nul < 0:
+                    raise ValueError('corrupted index entry')
+                length = nul - pos
+            name = data[pos:pos + length]
+            # entries are padded with 1 to 8 NUL to a multiple of 8
+            pos = start + ((pos - start + length + 8) & ~7)
+
+        yield os.fsdecode(name), mtime, mtime_ns, mode, size, flags, extended
+
+    while pos < end:
+        if pos + EXTENSION.size > end:
+            raise ValueError('truncated index extension')
+        signature, size = EXTENSION.unpack_from(data, pos)
+        if signature in UNSUPPORTED:
+            raise ValueError(f'index extension {signature} not supported')
+        pos += EXTENSION.size + size
+    if pos != end:
+        raise ValueError('corrupted index extensions')
+
+
+def scan_worktree(repo):
+    """
+    Compare the stat data cached in the index with the worktree, like git does before
+    hashing anything
+    :param repo: repo os path
+    :return: (changed, ambiguous) lists of paths, changed are surely modified/deleted/unmerged,
+             ambiguous need git to look at the content (racy, touched, mode, submodule),
+             None if the index can't be read here
+    """
+    path = os.path.join(git_dir(repo), 'index')
+    changed = []
+    ambiguous = []
+    try:
+        with open(path, 'rb') as f:
+            index_mtime = os.fstat(f.fileno()).st_mtime_ns
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for name, mtime, mtime_ns, mode, size, flags, extended in read_entries(data):
+                    if flags & STAGE or extended & INTENT_TO_ADD:
+                        changed.append(name)
+                        continue
+                    if flags & ASSUME_VALID or extended & SKIP_WORKTREE:
+                        continue
+                    state = compare(repo, name, mtime, mtime_ns, mode, size, index_mtime)
+                    if state == 'changed':
+                        changed.append(name)
+                    elif state == 'ambiguous':
+                        ambiguous.append(name)
+    except FileNotFoundError:
+        # no index yet, nothing tracked
+        return [], []
+    except (OSError, ValueError) as e:
+        print(f"cannot read {path}: {e}")
+        return None
+    return changed, ambiguous
+
+
+def compare(repo, name, mtime, mtime_ns, mode, size, index_mtime):
+    """
+    :return: 'clean', 'changed' or 'ambiguous'
+    """
+    kind = stat.S_IFMT(mode)
+    if kind == GITLINK:
+        return 'ambiguous'
+    try:
+        st = os.lstat(os.path.join(repo, name))
+    except (FileNotFoundError, NotADirectoryError):
+        return 'changed'
+
+    st_kind = stat.S_IFMT(st.st_mode)
+    if st_kind == stat.S_IFDIR:
+        return 'changed'
+    if st_kind != kind:
+        # symlinks can be checked out as plain files (core.symlinks)
+        return 'ambiguous'
+    # the index only keep the low 32 bits of the size
+    if st.st_size & 0xffffffff != size:
+        return 'changed'
+    if kind == stat.S_IFREG and (st.st_mode & 0o100) != (mode & 0o100):
+        # only a change if core.fileMode
+        return 'ambiguous'
+
+    st_mtime, st_mtime_ns = divmod(st.st_mtime_ns, 1000000000)
+    if st_mtime != mtime or (mtime_ns != 0 and st_mtime_ns != mtime_ns):
+        return 'ambiguous'
+    # racy: written in the same second as the index, the content may have changed since
+    if mtime >= index_mtime // 1000000000:
+        return 'ambiguous'
+    return 'clean'
@@ -0,0 +1,87 @@
+import re
+import time
+
+# ex: 'Receiving objects:  42% (420/1000), 12.00 MiB | 3.00 MiB/s'
+#     'remote: Counting objects: 100% (5/5), done.'
+#     'Enumerating objects: 5, done.'
+PROGRESS = re.compile(r'(?P<remote>remote: )?(?P<phase>[A-Z][A-Za-z ]*?):\s+'
+                      r'(?:(?P<percent>\d+)% \((?P<current>\d+)/(?P<total>\d+)\)|(?P<count>\d+))'
+                      r'(?:, (?P<size>[\d.]+ (?:bytes|[KMGT]iB))(?: \| (?P<rate>[\d.]+ (?:bytes|[KMGT]iB)/s))?)?'
+                      r'(?P<done>, done\.)?\s*$')
+
+
+class Progress:
+    """
+    One progress line of git (pull/push/fetch/clone --progress)
+    """
+
+    def __init__(self, phase, percent=None, current=None, total=None, size=None, rate=None, remote=False,
+                 done=False):
+        self.phase = phase  # ex: 'Receiving objects'
+        self.percent = percent  # None if git only give a count
+        self.current = current
+        self.total = total
+        self.size = size  # ex: '12.00 MiB'
+        self.rate = rate  # ex: '3.00 MiB/s'
+        self.remote = remote  # phase run by the remote
+        self.done = done
+
+    def __repr__(self):
+        return f'Progress(phase={self.phase}, percent={self.percent}, current={self.current}, ' \
+               f'total={self.total}, size={self.size}, rate={self.rate})'
+
+    def text(self):
+        """
+        Short text for the label, ex: 'Receiving objects 42% - 12.00 MiB | 3.00 MiB/s'
+        """
+        text = self.phase
+        if self.percent is not None:
+            text += f' {self.percent}%'
+        elif self.current is not None:
+            text += f' {self.current}'
+        if self.size is not None:
+            text += f' - {self.size}'
+            if self.rate is not None:
+                text += f' | {self.rate}'
+        return text
+
+
+def parse_progress(line):
+    """
+    :param line: one stderr line of git, split on '\\r' and '\\n'
+    :return: Progress, None if the line is not a progress line
+    """
+    match = PROGRESS.match(line)
+    if match is None:
+        return None
+    if match['percent'] is not None:
+        percent, current, total = int(match['percent']), int(match['current']), int(match['total'])
+    else:
+        percent, current, total = None, int(match['count']), None
+    return Progress(match['phase'], percent, current, total, match['size'], match['rate'],
+                    match['remote'] is not None, match['done'] is not None)
+
+
+class ProgressRelay:
+    """
+    Forward the progress of a command at most every `interval` seconds, a new phase or the
+    end of a phase is always forwarded. Fast local transfers print thousands of lines, the
+    GUI only need a few updates per second.
+    """
+
+    def __init__(self, callback, interval=0.1):
+        """
+        :param callback: callable(Progress)
+        """
+        self.callback = callback
+        self.interval = interval
+        self.last = 0.0
+        self.phase = None
+
+    def __call__(self, progress):
+        now = time.monotonic()
+        if progress.phase == self.phase and not progress.done and now - self.last < self.interval:
+            return
+        self.phase = progress.phase
+        self.last = now
+        self.callback(progress)
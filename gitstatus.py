@@ -0,0 +1,82 @@
+# followed by --untracked-files=<all|normal>, normal report an untracked dir as one 'dir/' entry
+STATUS_ARGS = ['status', '--porcelain=v2', '-z', '--branch']
+
+
+class WorkStatus:
+    """
+    Everything `git status --porcelain=v2 -z --branch` report about a repo
+    """
+
+    def __init__(self):
+        self.oid = None  # HEAD sha, None before the first commit
+        self.branch = None  # None if detached
+        self.upstream = None  # ex: 'origin/main'
+        self.ahead = 0
+        self.behind = 0
+        self.unstaged = []  # modified/deleted in the worktree
+        self.staged = []  # changed in the index, renamed ones by their new path
+        self.renamed = {}  # new path => original path
+        self.conflicted = []
+        self.untracked = []  # untracked dirs end with '/' if not listed file by file
+
+    def __repr__(self):
+        return f'WorkStatus(branch={self.branch}, upstream={self.upstream}, ahead={self.ahead}, ' \
+               f'behind={self.behind}, unstaged={len(self.unstaged)}, staged={len(self.staged)}, ' \
+               f'conflicted={len(self.conflicted)}, untracked={len(self.untracked)})'
+
+    @property
+    def head(self):
+        """
+        Branch name, or sha if detached
+        """
+        if self.branch is not None:
+            return self.branch
+        return self.oid
+
+
+def parse_status(data):
+    """
+    Parse the output of STATUS_ARGS
+    :param data: str
+    :return: WorkStatus
+    """
+    status = WorkStatus()
+    records = data.split('\0')
+    i = 0
+    while i < len(records):
+        record = records[i]
+        i += 1
+        if record == '':
+            continue
+
+        kind = record[0]
+        if kind == '#':
+            key, _, value = record[2:].partition(' ')
+            if key == 'branch.oid' and value != '(initial)':
+                status.oid = value
+            elif key == 'branch.head' and value != '(detached)':
+                status.branch = value
+            elif key == 'branch.upstream':
+                status.upstream = value
+            elif key == 'branch.ab':
+                ahead, _, behind = value.partition(' ')
+                status.ahead = int(ahead[1:])
+                status.behind = int(behind[1:])
+        elif kind == '?':
+            status.untracked.append(record[2:])
+        elif kind == '1' or kind == '2':
+            # 1 XY sub mH mI mW hH hI path
+            # 2 XY sub mH mI mW hH hI Xscore path, then the original path as next record
+            fields = record.split(' ', 9 if kind == '2' else 8)
+            xy, path = fields[1], fields[-1]
+            if kind == '2':
+                status.renamed[path] = records[i]
+                i += 1
+            if xy[0] != '.':
+                status.staged.append(path)
+            if xy[1] != '.':
+                status.unstaged.append(path)
+        elif kind == 'u':
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            status.conflicted.append(record.split(' ', 10)[-1])
+    return status
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import threading
+
+from collections import deque
+
+
+class CommandTrace:
+    """
+    Record of every git command run by a GitEngine: repo, argv, start/end, submitting thread,
+    exit code and output size. The last `size` records are kept for the Chrome trace export,
+    per repo and per command totals are kept for the whole session.
+
+    Recording is a few dict updates under a lock, nothing compared to spawning git, so it can
+    stay on all the time.
+    """
+
+    def __init__(self, size=10000):
+        self.records = deque(maxlen=size)
+        self.repos = {}  # repo => [count, total s, max s]
+        self.commands = {}  # git sub command => [count, total s, max s]
+        self.lock = threading.Lock()
+        self.version = 0  # bumped at each record, to refresh views only when needed
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+
+    def record(self, repo, argv, start, end, thread, lane, code, out_bytes, err_bytes):
+        """
+        :param repo: working dir of the command
+        :param argv: full command, ex: ['git', 'status', ...]
+        :param start: time.perf_counter() at spawn
+        :param end: time.perf_counter() at exit
+        :param thread: name of the thread that submitted the command
+        :param lane: concurrency slot the command ran in, used as Chrome trace tid
+        :param code: exit code, negative if the command was killed (cancelled), None if it could not start
+        """
+        duration = end - start
+        command = command_name(argv)
+        with self.lock:
+            self.records.append((repo, argv, start, end, thread, lane, code, out_bytes, err_bytes))
+            add_time(self.repos, repo, duration)
+            add_time(self.commands, command, duration)
+            self.version += 1
+
+    def slowest(self, n=5):
+        """
+        :return: ([(repo, count, total, max)], [(command, count, total, max)]) by total time
+        """
+        with self.lock:
+            repos = [(k, *v) for k, v in self.repos.items()]
+            commands = [(k, *v) for k, v in self.commands.items()]
+        repos.sort(key=lambda i: i[2], reverse=True)
+        commands.sort(key=lambda i: i[2], reverse=True)
+        return repos[:n], commands[:n]
+
+    def summary(self, n=5):
+        """
+        Slowest repos and commands as text
+        """
+        repos, commands = self.slowest(n)
+        lines = ['Slowest repos:']
+        for repo, count, total, longest in repos:
+            lines.append(f"  {total * 1000:8.0f} ms  {count:5} cmd  max {longest * 1000:6.0f} ms  "
+                         f"{os.path.basename(repo)}")
+        lines.append('Slowest commands:')
+        for command, count, total, longest in commands:
+            lines.append(f"  {total * 1000:8.0f} ms  {count:5} cmd  max {longest * 1000:6.0f} ms  git {command}")
+        return '\n'.join(lines)
+
+    def export_chrome(self, path):
+        """
+        Write the kept records as a Chrome trace (chrome://tracing, ui.perfetto.dev)
+        :param path: json file path
+        :return: number of commands written
+        """
+        with self.lock:
+            records = list(self.records)
+
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'GitHUD git commands'}}]
+        lanes = set()
+        for repo, argv, start, end, thread, lane, code, out_bytes, err_bytes in records:
+            lanes.add(lane)
+            events.append({
+                'name': f"git {command_name(argv)}",
+                'cat': os.path.basename(repo),
+                'ph': 'X',
+                'ts': round((start - self.origin) * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1),
+                'pid': pid,
+                'tid': lane,
+                'args': {'repo': repo, 'argv': argv, 'thread': thread, 'exit_code': code,
+                         'stdout_bytes': out_bytes, 'stderr_bytes': err_bytes},
+            })
+        for lane in sorted(lanes):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': lane,
+                           'args': {'name': f'slot {lane}'}})
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'start': self.origin_wall}}, f)
+        return len(records)
+
+
+def add_time(totals, key, duration):
+    entry = totals.get(key)
+    if entry is None:
+        totals[key] = [1, duration, duration]
+    else:
+        entry[0] += 1
+        entry[1] += duration
+        if duration > entry[2]:
+            entry[2] = duration
+
+
+def command_name(argv):
+    """
+    Git sub command of a command line, global options (-c x=y, -C dir, --no-pager...) skipped
+    :param argv: ['git', ...]
+    """
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ('-c', '-C', '--git-dir', '--work-tree'):
+            i += 2
+        elif arg.startswith('-'):
+            i += 1
+        else:
+            return arg
+    return ''
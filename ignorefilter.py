@@ -0,0 +1,76 @@
+import re
+
+# top level dirs hidden from the change list: jetbrains config (Pycharm, CLion, etc....), python venv
+ROOT_DIRS = ['.idea', 'venv']
+# dirs hidden at any depth
+DIRS = ['__pycache__']
+
+
+class IgnoreFilter:
+    """
+    Files hidden from the change list, compiled once from the config:
+        - ignore: entries matched against the file name, a string hide the files whose name
+          contains it, a list hide the files whose name contains all its strings
+        - ignore_root_dirs: top level dirs, default ROOT_DIRS
+        - ignore_dirs: dirs at any depth, default DIRS
+
+    A path is tested with at most two regex searches, whatever the number of rules.
+    """
+
+    def __init__(self, ignore=None, root_dirs=None, dirs=None):
+        if ignore is None:
+            ignore = []
+        if root_dirs is None:
+            root_dirs = ROOT_DIRS
+        if dirs is None:
+            dirs = DIRS
+
+        # anchored at the start of the file name: one lookahead per string of an entry
+        names = []
+        for i in ignore:
+            if type(i) is str:
+                i = [i]
+            if type(i) is list:
+                names.append(''.join(f'(?=.*?{re.escape(j)})' for j in i))
+        self.names = None
+        if len(names) > 0:
+            self.names = re.compile('|'.join(f'(?:{i})' for i in names), re.DOTALL)
+
+        paths = []
+        if len(root_dirs) > 0:
+            paths.append(f"^(?:{'|'.join(re.escape(i) for i in root_dirs)})(?:/|$)")
+        if len(dirs) > 0:
+            paths.append(f"(?:^|/)(?:{'|'.join(re.escape(i) for i in dirs)})/")
+        self.paths = None
+        if len(paths) > 0:
+            self.paths = re.compile('|'.join(paths), re.DOTALL)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get('ignore', []), config.get('ignore_root_dirs', ROOT_DIRS),
+                   config.get('ignore_dirs', DIRS))
+
+    def match(self, path):
+        """
+        :param path: '/' separated path relative to the repo
+        :return: True if the file is hidden
+        """
+        if self.paths is not None and self.paths.search(path):
+            return True
+        if self.names is not None and self.names.match(path, path.rfind('/') + 1):
+            return True
+        return False
+
+    def filter(self, paths):
+        """
+        :param paths: [path]
+        :return: [path] not hidden, empty ones removed
+        """
+        out = [i for i in paths if i != '']
+        if self.paths is not None:
+            search = self.paths.search
+            out = [i for i in out if not search(i)]
+        if self.names is not None:
+            match = self.names.match
+            out = [i for i in out if not match(i, i.rfind('/') + 1)]
+        return out
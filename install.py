@@ -17,7 +17,11 @@ def install_linux():
         os.mkdir(path)
 
     copyfile(f'{current_dir}/main.py', f'{path}/main.py')
-    copyfile(f'{current_dir}/window.ui', f'{path}/window.ui')
+    for module in ['gitcmd.py', 'statuscache.py', 'watcher.py', 'discovery.py', 'refs.py', 'diffcache.py',
+                   'config.py', 'repostatus.py', 'scan.py', 'ui_window.py', 'gitindex.py',
+                   'gitstatus.py', 'ignorefilter.py', 'gittrace.py',
+                   'scheduler.py', 'fleet.py', 'gitprogress.py']:
+        copyfile(f'{current_dir}/{module}', f'{path}/{module}')
     copyfile(f'{current_dir}/githud_icon.png', f'{path}/githud_icon.png')
     copytree(f'{current_dir}/icon/', f'{path}/icon/', dirs_exist_ok=True)
 
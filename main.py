@@ -1,56 +1,188 @@
+import time
+
+START = time.perf_counter()
+
 import os
 import sys
 import subprocess
+
+if __name__ == "__main__" and '--scan' in sys.argv:
+    # headless mode, Qt is never imported
+    import scan
+    sys.exit(scan.main([i for i in sys.argv[1:] if i != '--scan']))
+
 import logging
-import time
-import re
 import shutil
+import threading
 
-from yaml import load, Loader
+from collections import deque
 
 from pathlib import Path
 
 from PySide2.QtWidgets import QApplication, QWidget, QLabel, QTableWidgetItem, QPushButton, QStyle, QMainWindow,\
-    QTreeWidget, QTreeWidgetItem, QHBoxLayout, QMessageBox, QMenu
-from PySide2.QtCore import QFile, QThread, Signal, Qt, QTimer
+    QTreeWidget, QTreeWidgetItem, QHBoxLayout, QMessageBox, QMenu, QStyledItemDelegate, QStyleOptionViewItem,\
+    QAbstractItemView, QToolTip
+from PySide2.QtCore import QThread, Signal, Qt, QTimer, QObject, QEventLoop, QAbstractItemModel, QModelIndex
 from PySide2 import QtCore
-from PySide2.QtGui import QIcon, QPixmap, QPalette, QColor, QClipboard, QGuiApplication, QPainter, QStandardItem, QStandardItemModel
-from PySide2.QtUiTools import QUiLoader
+from PySide2.QtGui import QCursor, QIcon, QPixmap, QPalette, QColor, QClipboard, QGuiApplication, QPainter, QStandardItem, QStandardItemModel
+
+from ui_window import Window
+from gitcmd import GitEngine, cmd_str
+from gittrace import CommandTrace
+from gitprogress import ProgressRelay
+from scheduler import StatusScheduler, SELECTED, BACKGROUND, CACHED, LOCAL, REMOTE, FULL
+from fleet import Fleet, FETCH, PULL, PUSH, OK, summary
+from statuscache import StatusCache
+from watcher import RepoWatcher
+import discovery
+from refs import RefStore
+from repostatus import RepoStatus, untracked_args, split_z
+from config import load_config
+from gitstatus import WorkStatus
+from ignorefilter import IgnoreFilter
+from diffcache import DiffCache, INDEX_ARGS, parse_index, split_diff
 
 FORMAT = '%(message)s'
 logging.basicConfig(format=FORMAT)
 log = logging.getLogger()
 log.setLevel(35)
 
-
-class Bash(QThread):
-    strt = Signal()
-    ret = Signal(object)
+IMPORTED = time.perf_counter()
+
+ICON_DIR = Path(__file__).resolve().parent / 'icon'
+
+# icons loaded once for the whole process, {name: QIcon}
+ICONS = {}
+
+# Folder.status flags, stored in the model under STATUS_ROLE
+UNCHECKED = 1
+ERROR = 2
+NEED_PULL = 4
+NEED_PUSH = 8
+NEED_COMMIT = 16
+REPO = 32
+ROOT = 64
+
+STATUS_ROLE = Qt.UserRole + 1
+
+
+def get_icon(name):
+    """
+    Shared icon of the registry, the file is only read the first time
+    :param name: path relative to the icon dir, ex: 'spin/1.png'
+    :return: QIcon
+    """
+    icon = ICONS.get(name)
+    if icon is None:
+        icon = QIcon(os.fspath(ICON_DIR / name))
+        ICONS[name] = icon
+    return icon
+
+
+def status_icon(status):
+    """
+    :param status: Folder.status flags
+    :return: QIcon
+    """
+    if status & UNCHECKED:
+        return get_icon('arrow-circle-315.png')
+    elif status & ERROR:
+        return get_icon('exclamation-red.png')
+    elif status & REPO:
+        if status & NEED_PULL:
+            return get_icon('drive-download.png')
+        elif status & NEED_PUSH:
+            return get_icon('drive-upload.png')
+        elif status & NEED_COMMIT:
+            return get_icon('disk--plus.png')
+        return get_icon('document.png')
+    elif status & ROOT:
+        return get_icon('drive.png')
+    return get_icon('folder-horizontal.png')
+
+
+class Discover(QThread):
+    """
+    Find the repositories in background, each batch is sent to the tree as soon as it is found
+    """
+
+    found = Signal(object)
 
     def __init__(self, parent):
         QThread.__init__(self)
         self.parent = parent
-        self.cmd = ''
-        self.is_running = False
 
     def __del__(self):
         self.wait()
 
     def run(self):
+        hud = self.parent
+        discovery.find_repos(hud.directory_paths, exclude=hud.exclude, max_depth=hud.max_depth,
+                             nested=hud.nested_repos, workers=hud.workers, on_found=self.on_found)
 
-        # print("Bash.run()")
-        # self.strt.emit()
-        self.is_running = True
-        self.parent.disable_buttons()
-        self.parent.progress.start()
+    def on_found(self, root, paths):
+        self.parent.fix_remotes(paths)
+        self.found.emit({root: paths})
+
+
+class GitJob(QObject):
+    """
+    Long git command (pull/push) running in GitHUD.git_engine, result is emitted on the GUI thread
+    """
+    strt = Signal()
+    ret = Signal(object)
+    # gitprogress.Progress of commands started with progress=True, a few per second at most
+    progress = Signal(object)
+
+    def __init__(self, parent):
+        QObject.__init__(self)
+        self.parent = parent
+        self.cmd = ''
+        self.future = None
 
-        ret = subprocess.run(self.cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    @property
+    def is_running(self):
+        return self.future is not None and not self.future.done()
 
+    def start(self, args, path, progress=False):
+        """
+        :param progress: args must then include --progress, git stderr is read as it come
+        """
+        self.cmd = ' '.join(['git'] + args)
+        self.parent.disable_buttons()
+        on_progress = None
+        if progress:
+            on_progress = ProgressRelay(self.progress.emit)
+        self.future = self.parent.git_engine.submit(args, path, on_progress=on_progress)
+        self.future.add_done_callback(self.done)
+
+    def start_chain(self, steps, path):
+        """
+        :param steps: [(args, input)] run one after the other, stop at first failure
+        """
+        self.cmd = ' && '.join([' '.join(['git'] + i[0]) for i in steps])
+        self.parent.disable_buttons()
+        self.future = self.parent.git_engine.submit_chain(steps, path)
+        self.future.add_done_callback(self.done)
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self, future):
+        # called from the engine thread, signal is queued to the GUI thread
+        if future.cancelled():
+            ret = subprocess.CompletedProcess(self.cmd.split(' '), -1, '', 'cancelled')
+        elif future.exception() is not None:
+            ret = subprocess.CompletedProcess(self.cmd.split(' '), -1, '', str(future.exception()))
+        else:
+            ret = future.result()
         self.ret.emit(ret)
-        self.is_running = False
+        print("GitJob.done()")
+
 
-        # self.parent.enable_buttons()
-        print("Bash.run() ended!")
+class GitWait(QObject):
+    done = Signal()
 
 
 class Update(QThread):
@@ -59,83 +191,120 @@ class Update(QThread):
         QThread.__init__(self)
         self.parent = parent
         self.is_running = False
+        # CACHED: repos with an unchanged fingerprint keep their cached remote status, the
+        # worktree is checked, REMOTE: the remotes are asked again too, FULL: nothing is cached
+        self.force = FULL
 
     def __del__(self):
         self.wait()
 
     def run(self):
         print("start updating repositories status")
-        self.parent.ui.update_tree.setEnabled(False)
         self.is_running = True
-        items = self.parent.list_items()
+        paths = list(self.parent.repo_items)
+        batch = self.parent.status_batch
 
-        buff = []
-        for i in items:
-            if i.is_repo:
-                buff.append(i)
+        for i in paths:
+            if self.force == FULL or self.parent.status_cache.get(i) is None:
+                batch.post(i, None)
 
-        items = buff
-
-        for i in buff:
-            i.status_checked = False
-            i.update_icon()
-
-        for i in items:
-            if type(i) == Folder:
-                if i.is_repo:
-                    self.parent.check_repo_status(i)
-        self.parent.ui.update_tree.setEnabled(True)
+        # the repos looked at are served first, each status is applied as soon as checked
+        self.parent.scheduler.request_many(paths, BACKGROUND, self.force)
+        # the cache is saved by the scheduler idle callback once the last check end
+        self.parent.scheduler.join()
         self.is_running = False
         print("update ended")
 
 
-class UpdateSingle(QThread):
-
-    def __init__(self, parent):
-        QThread.__init__(self)
-        self.parent = parent
-        self.path = None
-
-    def __del__(self):
-        self.wait()
-
-    def run(self):
-        print(f"start updating single status:{self.path}")
-        path = self.path
-        items = self.parent.list_items()
-
-        for i in items:
-            if i.os_path == path:
-                self.parent.check_repo_status(i)
-                break
+class StatusBatch(QObject):
+    """
+    Repo status posted by the worker threads, applied to the tree by the GUI thread at
+    most once per frame, with one dataChanged per group of sibling rows
+    """
 
-        self.path = None
-        print("update ended")
+    posted = Signal()
 
+    def __init__(self, hud, interval=16):
+        QObject.__init__(self)
+        self.hud = hud
+        # {repo path: status dict, None if being checked}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.posted.connect(self.schedule, Qt.QueuedConnection)
 
-class UpdateProgress(QThread):
-    update_progress = Signal(int)
-    ended = Signal()
+    def post(self, path, status):
+        """
+        Can be called from any thread, the latest status of a repo wins
+        :param path: repo os path
+        :param status: status dict, None to show the repo as being checked
+        """
+        with self.lock:
+            first = len(self.pending) == 0
+            self.pending[path] = status
+        if first:
+            self.posted.emit()
+
+    def schedule(self):
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+
+        model = self.hud.model
+        changed = {}  # parent Folder => [rows]
+        model.blockSignals(True)
+        try:
+            for path, status in pending.items():
+                repo = self.hud.repo_items.get(path)
+                if repo is None:
+                    continue
+                if status is None:
+                    flags = repo.status | UNCHECKED
+                else:
+                    flags = self.hud.status_flags(repo, status)
+                if flags != repo.status:
+                    repo.set_status(flags)
+                    changed.setdefault(repo.parent, []).append(repo.row())
+        finally:
+            model.blockSignals(False)
+
+        for parent, rows in changed.items():
+            top = parent.child(min(rows)).index()
+            bottom = parent.child(max(rows)).index()
+            model.dataChanged.emit(top, bottom, [STATUS_ROLE])
+
+
+class FleetRun(QThread):
+    """
+    Fetch/pull/push of many repos in background, see fleet.Fleet
+    """
+    result = Signal(object)
+    done = Signal(object)
 
     def __init__(self, parent):
         QThread.__init__(self)
         self.parent = parent
+        self.op = None
+        self.paths = []
 
     def __del__(self):
         self.wait()
 
-    def run(self):
-        i = 0
-        while self.parent.bash.is_running:
-            i += 5
-            if i > 100:
-                i = 0
-            # print(f"update_progress(i={i})")
-            time.sleep(0.1)
-            self.update_progress.emit(i)
+    def start_op(self, op, paths):
+        self.op = op
+        self.paths = paths
+        self.start()
 
-
-        self.ended.emit()
+    def run(self):
+        results = self.parent.fleet.run(self.op, self.paths, self.result.emit)
+        self.done.emit(results)
 
 
 class Spin(QThread):
@@ -156,6 +325,306 @@ class Spin(QThread):
         self.ended.emit()
 
 
+class ChangeModel(QAbstractItemModel):
+    """
+    Change list of the selected repo: modified files (checkable) then cached files.
+
+    Rows are handed to the view by batch when it scrolls (fetchMore), the check states
+    are a bytearray and diffs are only computed when a tooltip is shown, so a repo with
+    50k untracked files does not freeze the window.
+
+    Untracked dirs are one 'dir/' row, their files are listed in background the first
+    time the row is shown (for the count) and become child rows when it is expanded.
+    Child rows have the index of their dir in self.changes + 1 as internal id.
+    """
+
+    BATCH = 1000
+
+    listed = Signal(object, object)
+
+    def __init__(self, hud):
+        QAbstractItemModel.__init__(self)
+        self.hud = hud
+        self.repo = None
+        self.changes = []
+        self.checked = bytearray()
+        self.all_checked = False
+        self.cached = []
+        self.conflicted = set()
+        # rows already shown to the view
+        self.loaded = 0
+        # untracked dirs: {dir: [file]} once listed, dirs being listed, dirs expanded
+        self.dir_files = {}
+        self.listing = set()
+        self.expanded = set()
+        self.listed.connect(self.on_listed)
+
+    def total(self):
+        n = len(self.changes)
+        total = n + 2 if n > 0 else 0
+        if len(self.cached) > 0:
+            total += len(self.cached) + 1
+        return total
+
+    def row_kind(self, row):
+        """
+        :return: (kind, i), kind in 'changes_header', 'all', 'change', 'cached_header', 'cached',
+                 i the index in self.changes or self.cached
+        """
+        n = len(self.changes)
+        if n > 0:
+            if row == 0:
+                return 'changes_header', None
+            if row == 1:
+                return 'all', None
+            if row < n + 2:
+                return 'change', row - 2
+            row -= n + 2
+        if row == 0:
+            return 'cached_header', None
+        return 'cached', row - 1
+
+    def dir_of(self, index):
+        """
+        :return: index in self.changes if index is an untracked dir row, else None
+        """
+        if not index.isValid() or index.internalId() != 0:
+            return None
+        kind, i = self.row_kind(index.row())
+        if kind == 'change' and self.changes[i].endswith('/'):
+            return i
+        return None
+
+    def set_changes(self, repo, changes, cached, conflicted=()):
+        """
+        Replace the list, files still in it keep their check state
+        :param repo: repo os path the files belong to
+        :param changes: [file] modified files, untracked dirs end with '/'
+        :param cached: [str] cached files text
+        :param conflicted: files of changes shown as conflicted
+        """
+        previous = set()
+        if repo == self.repo:
+            previous = {c for c, k in zip(self.changes, self.checked) if k}
+        self.beginResetModel()
+        self.repo = repo
+        self.changes = changes
+        self.checked = bytearray(1 if c in previous else 0 for c in changes) if previous \
+            else bytearray(len(changes))
+        self.all_checked = False
+        self.cached = cached
+        self.conflicted = set(conflicted)
+        self.loaded = min(self.BATCH, self.total())
+        self.dir_files = {}
+        self.listing = set()
+        self.expanded = set()
+        self.endResetModel()
+
+    def clear(self):
+        self.changes = []
+        self.checked = bytearray()
+        self.set_changes(None, [], [])
+
+    def checked_files(self):
+        """
+        :return: [file], a checked untracked dir is one 'dir/' entry
+        """
+        return [c for c, k in zip(self.changes, self.checked) if k]
+
+    def list_dir(self, folder):
+        """
+        List the files of an untracked dir in background, on_listed() get the result
+        """
+        if folder in self.listing:
+            return
+        self.listing.add(folder)
+        repo = self.repo
+        future = self.hud.git_engine.submit(untracked_args(folder), repo)
+        future.add_done_callback(lambda f: self.listed.emit((repo, folder), f))
+
+    def on_listed(self, key, future):
+        repo, folder = key
+        if repo != self.repo or folder not in self.listing:
+            # the list changed meanwhile
+            return
+        self.listing.discard(folder)
+        try:
+            files = self.hud.ignore_filter.filter(split_z(future.result().stdout))
+        except Exception as e:
+            print(f"cannot list {folder}: {e}")
+            files = []
+        try:
+            i = self.changes.index(folder)
+        except ValueError:
+            return
+        parent = self.index(i + 2, 0) if i + 2 < self.loaded else QModelIndex()
+        if folder in self.expanded and parent.isValid() and len(files) > 0:
+            self.beginInsertRows(parent, 0, len(files) - 1)
+            self.dir_files[folder] = files
+            self.endInsertRows()
+        else:
+            self.dir_files[folder] = files
+        if parent.isValid():
+            self.dataChanged.emit(parent, parent, [Qt.DisplayRole])
+
+    def index(self, row, column, parent=QModelIndex()):
+        if column != 0 or row < 0:
+            return QModelIndex()
+        if parent.isValid():
+            i = self.dir_of(parent)
+            if i is None or row >= self.rowCount(parent):
+                return QModelIndex()
+            return self.createIndex(row, column, i + 1)
+        if row >= self.loaded:
+            return QModelIndex()
+        return self.createIndex(row, column, 0)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1 + 2, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self.loaded
+        i = self.dir_of(parent)
+        if i is None or self.changes[i] not in self.expanded:
+            return 0
+        return len(self.dir_files.get(self.changes[i], []))
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return self.loaded > 0
+        i = self.dir_of(parent)
+        if i is None:
+            return False
+        files = self.dir_files.get(self.changes[i])
+        return files is None or len(files) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return self.loaded < self.total()
+        i = self.dir_of(parent)
+        return i is not None and self.changes[i] not in self.expanded
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            # the dir is expanded, its files are shown as soon as they are listed
+            i = self.dir_of(parent)
+            if i is None:
+                return
+            folder = self.changes[i]
+            files = self.dir_files.get(folder)
+            if files is not None and len(files) > 0:
+                # rowCount() change with self.expanded, only between begin and end
+                self.beginInsertRows(parent, 0, len(files) - 1)
+                self.expanded.add(folder)
+                self.endInsertRows()
+                return
+            self.expanded.add(folder)
+            if files is None:
+                self.list_dir(folder)
+            return
+
+        count = min(self.BATCH, self.total() - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def flags(self, index):
+        if index.internalId() != 0:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        kind, _ = self.row_kind(index.row())
+        if kind == 'change' or kind == 'all':
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        if kind == 'cached':
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.internalId() != 0:
+            # file of an untracked dir
+            if role == Qt.DisplayRole or role == Qt.ToolTipRole:
+                return self.dir_files[self.changes[index.internalId() - 1]][index.row()]
+            return None
+
+        kind, i = self.row_kind(index.row())
+        if role == Qt.DisplayRole:
+            if kind == 'change':
+                path = self.changes[i]
+                if path.endswith('/'):
+                    files = self.dir_files.get(path)
+                    if files is None:
+                        # counted when first shown
+                        self.list_dir(path)
+                        return f"{path} (...)"
+                    return f"{path} ({len(files)} files)"
+                return path
+            elif kind == 'cached':
+                return self.cached[i]
+            elif kind == 'all':
+                return "-- All --"
+            elif kind == 'changes_header':
+                return "---- Modified files ----"
+            return "---- Cached files ----"
+        elif role == Qt.CheckStateRole:
+            if kind == 'change':
+                return Qt.Checked if self.checked[i] else Qt.Unchecked
+            elif kind == 'all':
+                return Qt.Checked if self.all_checked else Qt.Unchecked
+        elif role == Qt.ToolTipRole:
+            if kind == 'change':
+                path = self.changes[i]
+                if path.endswith('/'):
+                    return f"{path}\nuntracked dir, expand to list its files"
+                # the diff is only computed here
+                return f"{path}\n{self.hud.diff_tooltip(path)}"
+            elif kind == 'cached':
+                return self.cached[i]
+        elif role == Qt.ForegroundRole:
+            if kind == 'change' and self.changes[i] in self.conflicted:
+                return QColor(230, 80, 80)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid() or index.internalId() != 0:
+            return False
+        kind, i = self.row_kind(index.row())
+        checked = value == Qt.Checked
+        if kind == 'change':
+            self.checked[i] = 1 if checked else 0
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+            return True
+        elif kind == 'all':
+            self.all_checked = checked
+            self.checked = bytearray([1 if checked else 0]) * len(self.changes)
+            last = min(self.loaded - 1, len(self.changes) + 1)
+            self.dataChanged.emit(index, self.index(last, 0), [Qt.CheckStateRole])
+            return True
+        return False
+
+
+class StatusDelegate(QStyledItemDelegate):
+    """
+    Draw the folder tree icons from the status flags of each item, a status change
+    only store an int in the model and the icons are shared
+    """
+
+    def initStyleOption(self, option, index):
+        QStyledItemDelegate.initStyleOption(self, option, index)
+        status = index.data(STATUS_ROLE)
+        if status is not None:
+            option.icon = status_icon(status)
+            option.features |= QStyleOptionViewItem.HasDecoration
+
+
 class Folder(QStandardItem):
 
     def __init__(self, path, parent=None):
@@ -181,16 +650,16 @@ class Folder(QStandardItem):
             self.name = self.slash
 
         self.is_repo = False
-        self.need_pull = False
-        self.need_push = False
-        self.need_commit = False
-        self.status_error = False
-        self.status_checked = True
+        self.status = 0
+        if self.parent is None:
+            self.status = ROOT
 
         self.setText(self.name)
-        self.update_icon()
+        self.setData(self.status, STATUS_ROLE)
 
         self.folders = []
+        # {name: Folder}
+        self.children = {}
         self.files = []
 
     def __repr__(self):
@@ -206,88 +675,94 @@ class Folder(QStandardItem):
         path = self.path + self.slash + name
         _folder = Folder(path,self)
         self.folders.append(_folder)
+        self.children[name] = _folder
         self.appendRow(_folder)
         return _folder
 
     def make_repo(self):
         self.is_repo = True
+        self.set_status(self.status | REPO)
 
-    def get_folder(self, path):
-        # print(f"Folder.get_folder({path})")
-        pth = path.split(self.slash)
-        exist = False
-        _folder = None
+    @property
+    def need_pull(self):
+        return bool(self.status & NEED_PULL)
 
-        if len(pth) > 1:
-            p = self.slash.join(pth[1:])
-            f = self.get_folder(pth[0])
-            _folder = f.get_folder(p)
+    @property
+    def need_push(self):
+        return bool(self.status & NEED_PUSH)
 
-        else:
-            name = path
-            if len(self.folders) > 0:
+    @property
+    def need_commit(self):
+        return bool(self.status & NEED_COMMIT)
 
-                for i in self.folders:
-                    if i.name == name:
-                        exist = True
-                        _folder = i
+    @property
+    def status_error(self):
+        return bool(self.status & ERROR)
 
-            if not exist:
-                _folder = self.make_folder(name)
+    @property
+    def status_checked(self):
+        return not self.status & UNCHECKED
 
+    def get_folder(self, path):
+        """
+        Sub folder at path, missing folders are created
+        :param path: path relative to this folder, ex: 'a/b/c'
+        :return: Folder
+        """
+        # print(f"Folder.get_folder({path})")
+        _folder = self
+        for name in path.split(self.slash):
+            child = _folder.children.get(name)
+            if child is None:
+                child = _folder.make_folder(name)
+            _folder = child
         return _folder
 
+    def repos(self):
+        """
+        :return: [repo os path] of this folder and all its sub folders
+        """
+        out = []
+        stack = [self]
+        while stack:
+            folder = stack.pop()
+            if folder.is_repo:
+                out.append(folder.os_path)
+            stack.extend(reversed(list(folder.children.values())))
+        return out
+
     def add_folder(self, folder):
         folder.parent = self
         folder.path = self.path + self.slash + folder.path
         folder.depth = self.depth + 1
         self.folders.append(folder)
+        self.children[folder.name] = folder
+
+    def set_status(self, status):
+        """
+        Store the status flags, the view is only notified if they changed
+        """
+        if status != self.status:
+            self.status = status
+            self.setData(status, STATUS_ROLE)
+
+    def set_flag(self, flag, value):
+        if value:
+            self.set_status(self.status | flag)
+        else:
+            self.set_status(self.status & ~flag)
 
     def set_need_pull(self, pull):
-        self.need_pull = pull
-        self.update_icon()
+        self.set_flag(NEED_PULL, pull)
 
     def set_need_push(self, push):
-        self.need_push = push
-        self.update_icon()
+        self.set_flag(NEED_PUSH, push)
 
     def set_need_commit(self, commit):
-        self.need_commit = commit
-        self.update_icon()
+        self.set_flag(NEED_COMMIT, commit)
 
     def set_error(self, error):
-        self.status_error = error
-        self.update_icon()
-
-    def update_icon(self):
-
-        update = os.fspath(Path(__file__).resolve().parent / "icon/arrow-circle-315.png")
-        error = os.fspath(Path(__file__).resolve().parent / "icon/exclamation-red.png")
-        download = os.fspath(Path(__file__).resolve().parent / "icon/drive-download.png")
-        upload = os.fspath(Path(__file__).resolve().parent / "icon/drive-upload.png")
-        drive = os.fspath(Path(__file__).resolve().parent / "icon/drive.png")
-        file = os.fspath(Path(__file__).resolve().parent / "icon/document.png")
-        folder = os.fspath(Path(__file__).resolve().parent / 'icon/folder-horizontal.png')
-        save = os.fspath(Path(__file__).resolve().parent / 'icon/disk--plus.png')
-
-        if not self.status_checked:
-            self.setIcon(QIcon(update))
-        elif self.status_error:
-            self.setIcon(QIcon(error))
-        elif self.is_repo:
-            if self.need_pull:
-                self.setIcon(QIcon(download))
-            elif self.need_push:
-                self.setIcon(QIcon(upload))
-            elif self.need_commit:
-                self.setIcon(QIcon(save))
-            else:
-                self.setIcon(QIcon(file))
-        else:
-            if self.parent is None:
-                self.setIcon(QIcon(drive))
-            else:
-                self.setIcon(QIcon(folder))
+        self.set_flag(ERROR, error)
 
 
 class GitHUD(QMainWindow):
@@ -298,19 +773,24 @@ class GitHUD(QMainWindow):
     # TODO:         -if changes and not changes filtered => git reset
 
     in_progress = Signal()
-    update_single_status = Signal()
+    repos_changed = Signal(object)
+    diff_ready = Signal(object)
 
-    def __init__(self):
+    def __init__(self, config=None, autostart=True):
+        """
+        :param config: config dict, user.conf is loaded if None
+        :param autostart: start the discovery once the event loop run, False to drive the
+                          phases by hand (bench.py)
+        """
         QMainWindow.__init__(self)
         # super(GitHUD, self).__init__()
+        # startup phases: [(phase, time)], printed once the first status update is done
+        self.startup = [('imports', IMPORTED)]
         self.os = sys.platform
         icon = os.fspath(Path(__file__).resolve().parent / 'githud_icon.png')
         print(icon)
         self.setWindowIcon(QIcon(icon))
         self.setWindowTitle('GitHUD')
-        path1 = os.fspath(Path(__file__).resolve().parent / "main.py")
-        path2 = os.fspath(Path(__file__).resolve().parent / "main.pyw")
-        shutil.copyfile(path1, path2)
 
         # linux shortcut
         if self.os == 'linux':
@@ -326,23 +806,50 @@ class GitHUD(QMainWindow):
                 f.close()
 
         # get config data
-        path = os.fspath(Path(__file__).resolve().parent / "user.conf")
-
-        if not os.path.exists(path):
-            f = open(path,'w')
-            f.write('---\n')
-            f.write('path: [/home/path/]\n')
-            f.write('user: user\n')
-            f.write('extend: 190\n')
-            f.write('ignore: []\n')
-            f.close()
-
-        self.config_file = open(path, 'r')
-        self.config = load(self.config_file, Loader)
+        if config is None:
+            config = load_config()
+        self.config = config
         self.directory_paths = self.config['path']
         self.user = self.config['user']
         self.extend = self.config['extend']
         self.ignore = self.config['ignore']
+        # number of repositories checked in parallel by status update
+        self.workers = max(1, int(self.config.get('workers', 8)))
+        # repositories discovery
+        self.exclude = self.config.get('exclude', discovery.EXCLUDE)
+        self.max_depth = self.config.get('max_depth', None)
+        self.nested_repos = self.config.get('nested_repos', False)
+        # 'ls-remote' only ask the remote refs, 'fetch' do a fetch dry run
+        self.remote_probe = self.config.get('remote_probe', 'ls-remote')
+
+        for i in self.directory_paths:
+            if not os.path.exists(i):
+                raise ValueError("Path dont exist, please check user.conf")
+        self.timing('config')
+
+        # every git command is recorded, 'trace_file' in user.conf: Chrome trace written on exit
+        self.trace = CommandTrace(size=self.config.get('trace_size', 10000))
+        self.trace_file = self.config.get('trace_file', None)
+        self.trace_version = 0
+
+        # keep some room for user actions while a status update is running
+        self.git_engine = GitEngine(max_jobs=self.workers + 2, trace=self.trace)
+
+        # branches/remotes read from .git without spawning git
+        self.refs = RefStore()
+
+        # last known status of repos, shown until they are checked again
+        path = self.config.get('status_cache', os.fspath(Path(__file__).resolve().parent / "status_cache.json"))
+        self.status_cache = StatusCache(path)
+
+        # compiled once, 'ignore', 'ignore_root_dirs' and 'ignore_dirs' of user.conf
+        self.ignore_filter = IgnoreFilter.from_config(self.config)
+
+        # 'normal' show untracked dirs as one entry, 'all' list every untracked file
+        self.untracked_files = self.config.get('untracked_files', 'normal')
+
+        self.repo_status = RepoStatus(self.git, self.refs, self.ignore_filter, self.status_cache, self.remote_probe,
+                                      self.untracked_files)
 
         if self.user == 'user':
             self.popup_user()
@@ -357,25 +864,24 @@ class GitHUD(QMainWindow):
         self.build_gui()
         self.ui.setParent(self)
         self.setFixedSize(self.ui.size())
+        self.timing('ui')
 
         self.ui.msg.setPlaceholderText("Commit msg or new branch name")
 
         self.tree = self.ui.tree
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.tree_context_menu)
+        self.changes_model = ChangeModel(self)
+        self.tree.setModel(self.changes_model)
+        # untracked dirs can be expanded
+        self.tree.setRootIsDecorated(True)
 
         self.is_extended = False
 
-        self.tree_list = []
-
         if sys.platform == 'win32':
             self.os = "windows"
-            self.bash_and = '&'
-            self.bash_2_and = '&'
         else:
             self.os ="unix"
-            self.bash_and = ";"
-            self.bash_2_and = '&&'
 
         if self.os == "windows":
             self.slash = "\\"
@@ -383,6 +889,8 @@ class GitHUD(QMainWindow):
             self.slash = "/"
 
         self.projects = []
+        # {repo os path: Folder}
+        self.repo_items = {}
         self.sections = []
         self.branches = []
         self.local_branches = []
@@ -402,14 +910,25 @@ class GitHUD(QMainWindow):
 
         self.change_list = []
         self.cached_change_list = []
+        self.work_status = WorkStatus()
+        self.changes_busy = False
+
+        # diffs of the change list, loaded on tooltip
+        self.diff_index = {}
+        self.diff_cache = DiffCache(max_size=self.config.get('diff_cache_size', 8) * 1024 * 1024)
+        # diff being computed in background: (repo, {path: cache key}, hovered path, future)
+        self.diff_job = None
+        # (cache key, diff) of the last hovered file, kept even if the LRU evicted it
+        self.hovered_diff = None
+        self.diff_ready.connect(self.on_diff_ready)
+        self.max_diff_lines = self.config.get('max_diff_lines', 1000)
 
-        self.tree.itemChanged.connect(self.tree_changed)
 
         self.ui.folder_tree.setHeaderHidden(True)
 
         self.ui.combo_branch.currentTextChanged.connect(self.on_branch_choice)
 
-        self.ui.update_tree.clicked.connect(self.updates_repo_status)
+        self.ui.update_tree.clicked.connect(self.on_update_tree)
 
         self.ui.b_pull.clicked.connect(self.on_pull)
         self.ui.b_push.clicked.connect(self.on_push)
@@ -452,51 +971,79 @@ class GitHUD(QMainWindow):
         self.ui.b_delete_file.setToolTip("Delete selected file (Press ctrl key for unlock)")
 
 
-        self.b_delete = os.fspath(Path(__file__).resolve().parent / "icon/cross-button.png")
-        self.b_update = os.fspath(Path(__file__).resolve().parent / "icon/arrow-circle-315.png")
-        self.b_pull = os.fspath(Path(__file__).resolve().parent / "icon/arrow-skip-270.png")
-        self.b_push = os.fspath(Path(__file__).resolve().parent / "icon/arrow-skip-090.png")
-        self.b_reset = os.fspath(Path(__file__).resolve().parent / "icon/disk--minus.png")
-        self.b_clean = os.fspath(Path(__file__).resolve().parent / "icon/arrow-curve-180-left.png")
-        self.b_delete_file = os.fspath(Path(__file__).resolve().parent / "icon/cross.png")
-        self.b_extend_right = os.fspath(Path(__file__).resolve().parent / "icon/navigation/navigation-000-button-white.png")
-        self.b_extend_left = os.fspath(Path(__file__).resolve().parent / "icon/navigation/navigation-180-button-white.png")
+        self.b_delete = get_icon("cross-button.png")
+        self.b_update = get_icon("arrow-circle-315.png")
+        self.b_pull = get_icon("arrow-skip-270.png")
+        self.b_push = get_icon("arrow-skip-090.png")
+        self.b_reset = get_icon("disk--minus.png")
+        self.b_clean = get_icon("arrow-curve-180-left.png")
+        self.b_delete_file = get_icon("cross.png")
+        self.b_extend_right = get_icon("navigation/navigation-000-button-white.png")
+        self.b_extend_left = get_icon("navigation/navigation-180-button-white.png")
 
-        self.ui.b_delete.setIcon(QIcon(self.b_delete))
-        self.ui.b_update.setIcon(QIcon(self.b_update))
-        self.ui.update_tree.setIcon(QIcon(self.b_update))
-        self.ui.b_reset.setIcon(QIcon(self.b_reset))
-        self.ui.b_clean.setIcon(QIcon(self.b_clean))
-        self.ui.b_delete_file.setIcon(QIcon(self.b_delete_file))
-        self.ui.b_extend.setIcon(QIcon(self.b_extend_right))
+        self.ui.b_delete.setIcon(self.b_delete)
+        self.ui.b_update.setIcon(self.b_update)
+        self.ui.update_tree.setIcon(self.b_update)
+        self.ui.b_reset.setIcon(self.b_reset)
+        self.ui.b_clean.setIcon(self.b_clean)
+        self.ui.b_delete_file.setIcon(self.b_delete_file)
+        self.ui.b_extend.setIcon(self.b_extend_right)
 
-        self.ui.b_pull.setIcon(QIcon(self.b_pull))
-        self.ui.b_push.setIcon(QIcon(self.b_push))
+        self.ui.b_pull.setIcon(self.b_pull)
+        self.ui.b_push.setIcon(self.b_push)
 
         self.root = None
         self.model = QStandardItemModel(self.ui.folder_tree)
+        self.ui.folder_tree.setItemDelegate(StatusDelegate(self.ui.folder_tree))
 
         self.ui.folder_tree.doubleClicked.connect(self.on_repo_selected)
+        self.ui.folder_tree.setModel(self.model)
 
-        self.list_projects()
-        self.build_tree()
+        # repos are found after the window is shown, the tree fill in as they are found
+        self.discover = Discover(self)
+        self.discover.found.connect(self.add_repos)
+        self.discover.finished.connect(self.on_discovery_done)
 
         self.ui.progress.setVisible(False)
 
-        self.bash = Bash(self)
-        self.bash.strt.connect(self.start_progress)
-        self.bash.ret.connect(self.bash_ret)
-        self.bash_action = None
-
-        self.progress = UpdateProgress(self)
-
-        self.progress.update_progress.connect(self.update_progress)
-        self.progress.ended.connect(self.end_progress)
+        self.job = GitJob(self)
+        self.job.strt.connect(self.start_progress)
+        self.job.ret.connect(self.job_ret)
+        self.job_action = None
+        self.commit_push = False
+
+        self.job.progress.connect(self.update_progress)
+
+        # status results of the worker threads are applied by batch on the GUI thread
+        self.status_batch = StatusBatch(self)
+
+        # status checks by priority: selected repo, repos visible in the tree, then the others
+        self.scheduler = StatusScheduler(self.check_status, self.status_batch.post,
+                                         workers=self.workers, cancel=self.git_engine.cancel_where,
+                                         idle=self.status_cache.save)
+        self.visible_timer = QTimer(self)
+        self.visible_timer.setSingleShot(True)
+        self.visible_timer.setInterval(100)
+        self.visible_timer.timeout.connect(self.update_visible_repos)
+        tree = self.ui.folder_tree
+        tree.verticalScrollBar().valueChanged.connect(self.visible_timer.start)
+        tree.expanded.connect(self.visible_timer.start)
+        tree.collapsed.connect(self.visible_timer.start)
+
+        # fetch/pull/push of the repos selected in the tree, 'fleet_jobs' repos at a time
+        self.fleet = Fleet(self.git, self.repo_status, jobs=self.config.get('fleet_jobs', 4))
+        self.fleet_run = FleetRun(self)
+        self.fleet_run.result.connect(self.on_fleet_result)
+        self.fleet_run.done.connect(self.on_fleet_done)
+        self.fleet_count = 0
+        tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        tree.setContextMenuPolicy(Qt.CustomContextMenu)
+        tree.customContextMenuRequested.connect(self.folder_context_menu)
 
         self.status_update = Update(self)
+        self.status_update.started.connect(lambda: self.ui.update_tree.setEnabled(False))
+        self.status_update.finished.connect(self.on_status_done)
 
-        self.single_status = UpdateSingle(self)
-        self.update_single_status.connect(self.single_status.start)
 
         self.disable_buttons()
         self.lock_buttons()
@@ -505,26 +1052,81 @@ class GitHUD(QMainWindow):
         self.spin.ended.connect(self.update_spin)
         self.spin_state = 1
 
-        self.changes_update_timer = Spin(self, 2)
-        self.changes_update_timer.ended.connect(self.auto_update_changes)
-
         self.repo_selected = False
 
-        # disable until hadle for keep the check info
-        # self.auto_update_changes()
-
-        self.updates_repo_status()
-
+        self.watcher = None
         self.status_update_timer = Spin(self, 1800)
         self.status_update_timer.ended.connect(self.auto_update_status)
+
+        # slowest repos/commands shown in the update button tooltip
+        self.trace_timer = QTimer(self)
+        self.trace_timer.setInterval(2000)
+        self.trace_timer.timeout.connect(self.update_trace_summary)
+        self.trace_timer.start()
+
+        # run once the event loop is started, ie. the window is shown
+        if autostart:
+            QTimer.singleShot(0, self.start_discovery)
+
+    def timing(self, phase):
+        if self.startup is not None:
+            self.startup.append((phase, time.perf_counter()))
+
+    def report_startup(self):
+        """
+        Print the time spent in each startup phase, only once
+        """
+        if self.startup is None:
+            return
+        last = START
+        for phase, t in self.startup:
+            print(f"startup {phase:<10} {(t - last) * 1000:8.1f} ms")
+            last = t
+        print(f"startup {'total':<10} {(last - START) * 1000:8.1f} ms")
+        self.startup = None
+
+    def start_discovery(self):
+        self.timing('shown')
+        self.spin.start()
+        self.discover.start()
+
+    def on_discovery_done(self):
+        print(f"on_discovery_done({len(self.repo_items)} repos)")
+        self.timing('discovery')
+
+        # remotes only asked for the repos changed since last launch, worktrees are all checked
+        self.updates_repo_status(CACHED)
+
+        # repos are re-checked when inotify report a change, fallback on a periodic full update,
+        # with a watcher the periodic update only ask the remotes: inotify can't see their commits
+        if self.config.get('watch', True) and RepoWatcher.available():
+            self.watcher = RepoWatcher(self.repos_changed.emit, worktree=self.config.get('watch_worktree', True))
+            self.repos_changed.connect(self.on_repos_changed)
+            if self.watcher.start():
+                self.watcher.watch(list(self.repo_items))
+            else:
+                self.watcher = None
+
         self.status_update_timer.start()
 
+    def on_status_done(self):
+        self.ui.update_tree.setEnabled(True)
+        if self.startup is not None:
+            self.timing('status')
+            self.report_startup()
+
+    def update_trace_summary(self):
+        if self.trace.version == self.trace_version:
+            return
+        self.trace_version = self.trace.version
+        self.ui.update_tree.setToolTip(f"Update repositories status\n\n{self.trace.summary()}")
+
     def on_b_extend(self):
         extend = self.extend
 
         if not self.is_extended:
             self.is_extended = True
-            self.ui.b_extend.setIcon(QIcon(self.b_extend_left))
+            self.ui.b_extend.setIcon(self.b_extend_left)
             self.ui.setFixedWidth(self.ui.width() + extend)
             self.setFixedWidth(self.width() + extend)
             self.ui.folder_tree.setFixedWidth(self.ui.folder_tree.width() + extend)
@@ -534,7 +1136,7 @@ class GitHUD(QMainWindow):
 
         else:
             self.is_extended = False
-            self.ui.b_extend.setIcon(QIcon(self.b_extend_right))
+            self.ui.b_extend.setIcon(self.b_extend_right)
             self.ui.setFixedWidth(self.ui.width() - extend)
             self.setFixedWidth(self.width() - extend)
             self.ui.folder_tree.setFixedWidth(self.ui.folder_tree.width() - extend)
@@ -551,49 +1153,106 @@ class GitHUD(QMainWindow):
         if event.key() == Qt.Key_Control:
             self.lock_buttons()
 
+    def closeEvent(self, event):
+        if self.watcher is not None:
+            self.watcher.stop()
+        # queued checks dropped, running ones cancelled, then the engine fail what they still
+        # submit, so Update.run() leave its scheduler.join() and the thread can be waited
+        self.scheduler.stop()
+        self.git_engine.stop()
+        if not self.scheduler.join(5):
+            print(f"{self.scheduler.pending} status checks still running")
+        self.status_update.wait()
+        if self.trace_file is not None:
+            try:
+                count = self.trace.export_chrome(self.trace_file)
+                print(f"{count} git commands traced in {self.trace_file}")
+            except OSError as e:
+                print(f"cannot write {self.trace_file}: {e}")
+        QMainWindow.closeEvent(self, event)
+
+    def git(self, args, path=None, input=None):
+        """
+        Run a git command in a repository, when called from the GUI thread the Qt events
+        are still processed while waiting, so the window never freeze
+        :param args: git arguments, ex: ['add', '--', file]
+        :param path: repository path, self.path if None
+        :param input: optional str sent to git stdin
+        :return: subprocess.CompletedProcess
+        """
+        if path is None:
+            path = self.path
+
+        future = self.git_engine.submit(args, path, input)
+        if QThread.currentThread() == self.thread():
+            loop = QEventLoop()
+            wait = GitWait()
+            wait.done.connect(loop.quit, Qt.QueuedConnection)
+            future.add_done_callback(lambda f: wait.done.emit())
+            if not future.done():
+                loop.exec_()
+
+        return future.result()
+
+    def on_repos_changed(self, paths):
+        print(f"on_repos_changed({len(paths)} repos)")
+        for i in paths:
+            # a file save must not ask the remotes, the periodic update do
+            self.check_single_status(i, LOCAL)
+        if self.path in paths:
+            self.auto_update_changes()
+
     def auto_update_changes(self):
-        pass
         # print("auto_update_change")
-        # if self.repo_selected:
-        #     self.check_changes()
-        # self.changes_update_timer.start()
+        if self.repo_selected and not self.update_brch_lock and not self.changes_busy:
+            self.check_changes()
 
     def auto_update_status(self):
         print("auto_update_status")
-        self.updates_repo_status()
+        if self.watcher is not None:
+            self.updates_repo_status(REMOTE)
+        else:
+            self.updates_repo_status(FULL)
         self.status_update_timer.start()
 
     def update_spin(self):
-        if self.status_update.is_running:
+        if self.status_update.is_running or self.discover.isRunning():
             self.spin_state += 1
             if self.spin_state > 4:
                 self.spin_state = 1
-            path = f"icon/spin/{self.spin_state}.png"
-            path = os.fspath(Path(__file__).resolve().parent / path)
-            self.ui.update_tree.setIcon(QIcon(path))
+            self.ui.update_tree.setIcon(get_icon(f"spin/{self.spin_state}.png"))
             self.spin.start()
         else:
-            path = os.fspath(Path(__file__).resolve().parent / "icon/spin/1.png")
-            self.ui.update_tree.setIcon(QIcon(path))
+            self.ui.update_tree.setIcon(get_icon("spin/1.png"))
 
     def start_progress(self):
+        # busy bar until git report a percentage
         self.disable_buttons()
+        self.ui.progress.setRange(0, 0)
         self.ui.progress.setVisible(True)
-        self.progress.start()
 
-    def update_progress(self, i):
-        self.ui.progress.setValue(i)
+    def update_progress(self, progress):
+        """
+        :param progress: gitprogress.Progress
+        """
+        if progress.percent is None:
+            self.ui.progress.setRange(0, 0)
+        else:
+            self.ui.progress.setRange(0, 100)
+            self.ui.progress.setValue(progress.percent)
+        self.set_label(progress.text(), self.job.cmd)
 
     def end_progress(self):
+        self.ui.progress.setRange(0, 100)
         self.ui.progress.setValue(0)
         self.ui.progress.setVisible(False)
         self.enable_buttons()
 
     def iter_items(self, root):
         if root is not None:
-            stack = [root]
+            stack = deque([root])
             while stack:
-                parent = stack.pop(0)
+                parent = stack.popleft()
                 for row in range(parent.rowCount()):
                     for column in range(parent.columnCount()):
                         child = parent.child(row, column)
@@ -616,78 +1275,83 @@ class GitHUD(QMainWindow):
             return out
         return []
 
-    def expand_all(self):
-        items = self.list_items()
-        for item in items:
-            idx = item.index()
-            self.ui.folder_tree.setExpanded(idx, True)
+    def on_update_tree(self):
+        self.updates_repo_status()
 
-    def updates_repo_status(self):
+    def updates_repo_status(self, force=FULL):
+        """
+        :param force: check mode of the pass, CACHED, REMOTE or FULL
+        """
+        if not self.status_update.is_running:
+            self.status_update.force = force
         self.status_update.start()
         self.spin.start()
 
-    def check_repo_status(self, repo):
-        # print(f"check_repo_status({repo.name})--------------------------------")
-        cmd = f'cd {repo.os_path} {self.bash_2_and} git fetch -v --dry-run'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        # print(ret.stderr)
-        ret = ret.stderr.splitlines()
-        repo.status_checked = True
-        if ret == []:
-            repo.set_error(True)
-        else:
-            for i in ret:
-                i = re.sub(' +', ' ', i)
-                i = i.split(' ')
-                # print(f"a={i[-1] == 'origin/master'}, b={i[1] != '='}")
-                if i[-1] == 'origin/master' and i[1] != '=' :
-                    repo.set_need_pull(True)
-                elif i[-1] == 'origin/master' and i[1] == '=' :
-                    repo.set_need_pull(False)
-
-        self.check_push_status(repo)
-        self.check_commit_status(repo)
-
-    def check_push_status(self, repo):
-        # print(f"check_push_status()")
-        path1 = repo.os_path + self.slash + '.git'+ self.slash + 'refs' + self.slash + 'heads' + self.slash + 'master'
-        path2 = repo.os_path + self.slash + '.git'+ self.slash + 'refs' + self.slash + 'remotes' + self.slash + 'origin' + self.slash + 'master'
-
-        if os.path.exists(path1) and os.path.exists(path2):
-
-            f = open(path1, 'r')
-            data1 = f.readlines()
-            f.close()
-
-            f = open(path2, 'r')
-            data2 = f.readlines()
-            f.close()
-
-            if data1 != data2:
-
-                # print(f'repo {repo.name} need to be updated! ---------------------------------------')
-                # print(data1)
-                # print(data2)
-                repo.set_need_push(True)
-            else:
-                repo.set_need_push(False)
+    def check_status(self, path, force):
+        """
+        Status check run by the scheduler workers
+        :param force: CACHED, LOCAL, REMOTE or FULL
+        """
+        if force == LOCAL:
+            return self.repo_status.get_local_status(path)
+        if force == REMOTE:
+            return self.repo_status.get_remote_status(path)
+        return self.repo_status.get_cached_status(path, force == FULL)
 
-    def check_commit_status(self, repo):
-        changes = self.check_changes(repo.os_path)
-        cached = self.check_cached_changes(repo.os_path)
-        if len(changes) > 0 or len(cached) > 0:
-            repo.set_need_commit(True)
-        else:
-            repo.set_need_commit(False)
+    def set_repo_status(self, repo, status):
+        # GUI thread only, workers go through self.status_batch
+        repo.set_status(self.status_flags(repo, status))
 
-    def check_single_status(self, path):
-        self.single_status.path = path
-        self.update_single_status.emit()
+    def status_flags(self, repo, status):
+        """
+        :param repo: Folder
+        :param status: status dict
+        :return: Folder.status flags
+        """
+        flags = repo.status & (REPO | ROOT)
+        if status['error']:
+            flags |= ERROR
+        if status['need_pull']:
+            flags |= NEED_PULL
+        if status['need_push']:
+            flags |= NEED_PUSH
+        if status['need_commit']:
+            flags |= NEED_COMMIT
+        return flags
+
+    def check_single_status(self, path, force=FULL):
+        """
+        :param force: LOCAL for the changes seen by the watcher, FULL after a user action
+        """
+        # a check of the same repo still running is cancelled or followed by a new one
+        if path in self.repo_items:
+            self.scheduler.request(path, SELECTED if path == self.path else BACKGROUND, force)
+
+    def update_visible_repos(self):
+        """
+        Tell the scheduler which repos are on screen, from the rows of the folder tree viewport
+        """
+        tree = self.ui.folder_tree
+        height = tree.viewport().height()
+        paths = []
+        index = tree.indexAt(QtCore.QPoint(0, 0))
+        while index.isValid() and tree.visualRect(index).top() < height:
+            item = self.model.itemFromIndex(index)
+            if item.status & REPO:
+                paths.append(item.os_path)
+            index = tree.indexBelow(index)
+        self.scheduler.set_visible(paths)
 
     def on_repo_selected(self, index):
         print("GitHUD.on_repo_selected()")
         item = self.model.itemFromIndex(index)
+        if self.path != item.os_path:
+            # check states belong to the previous repo
+            self.changes_model.clear()
         self.path = item.os_path
+        if item.status & REPO:
+            self.scheduler.set_focus(self.path)
+            self.scheduler.request(self.path, SELECTED)
         section = self.path.split(self.slash)[-1]
         self.section = [section, self.path]
         # self.ui.label_repo.setText(self.section[0])
@@ -728,151 +1392,109 @@ class GitHUD(QMainWindow):
         self.ui.b_clean.setEnabled(True)
         self.ui.b_delete_file.setEnabled(True)
 
-    def tree_changed(self,item,col):
-        if len(self.tree_list) > 0:
-
-            if item == self.tree_list[0]:
-                if item.checkState(0) == Qt.Checked:
-                    self.select_all_changes()
-                elif item.checkState(0) != Qt.Checked:
-                    self.deselect_all_changes()
-
-    def select_all_changes(self):
-        for i in self.tree_list:
-            i.setCheckState(0, Qt.Checked)
-
-    def deselect_all_changes(self):
-        for i in self.tree_list:
-            i.setCheckState(0, Qt.Unchecked)
-
     def build_gui(self):
-        loader = QUiLoader()
-        path = os.fspath(Path(__file__).resolve().parent / "window.ui")
-        ui_file = QFile(path)
-        # ui_file = QFile('window.ui')
-        ui_file.open(QFile.ReadOnly)
-        self.ui = loader.load(ui_file, self)
-
-        ui_file.close()
-
-    def list_projects(self):
-
-        repo_list = []
-        for i in self.directory_paths:
-            if not os.path.exists(i):
-                raise ValueError("Path dont exist, please check user.conf")
-
-            for a,b,c in os.walk(i):
-                # a=path , b=folders[], c=files[]
-                if '.git' in b:
-                    d = a
-                    a = a.split(self.slash)
-
-                    prj = (self.slash.join(a[:-1])).split(i)
-                    if len(prj) == 1:
-                        prj = prj[0]
-                    else:
-                        prj = prj[-1]
-
-                    repo_list.append([prj,[a[-1:][0],d]])
+        # compiled from window.ui, see ui_window.py
+        self.ui = Window(self)
 
-        project_list = []
-        while len(repo_list) > 0:
-            project = repo_list.pop()
-            project[1] = [project[1]]
-
-            buff = []
-            for i in repo_list:
-                if i[0] == project[0]:
-                    project[1].append(i[1])
-                else:
-                    buff.append(i)
-
-            project_list.append(project)
-            repo_list = buff
-        projects = {}
-        for i in project_list:
-            projects[i[0]] = i[1]
-
-        for proj in project_list:
-            for j in proj[1]:
-                path = f'{j[1]}{self.slash}.git{self.slash}config'
+    def fix_remotes(self, paths):
+        """
+        Rewrite the http origin url of axus-automation repos to ssh, called from the discovery thread
+        :param paths: [repo path]
+        """
+        for repo in paths:
+            path = f'{repo}{self.slash}.git{self.slash}config'
+            try:
                 file = open(path,'r')
-                buff =[]
-                for k in file:
-                    buff.append(k)
-
-                file.close()
-
-                out = []
-                i = 0
-
-                while i < len(buff):
-                    if '[remote "origin"]' in buff[i]:
-                        break
-                    i += 1
-                if i == len(buff):
-                    continue
-                else:
-                    i += 1
-                    line = buff[i].split(' ')
-                    if line[0] == '\turl' and line[2][:30] == 'http://git.axus-automation.fr/':
-                        line[2] = 'git@git.axus-automation.fr:' + line[2][30:]
-                        line = ' '.join(line)
-                        print('fix:')
-                        print(line)
-                        buff[i] = line
-
-                        shutil.copyfile(path, f'{path}.bak' )
+            except OSError:
+                continue
+            buff = []
+            for k in file:
+                buff.append(k)
 
-                        file = open(path, 'w')
-                        for i in buff:
-                            file.write(i)
+            file.close()
 
-                        file.close()
+            i = 0
 
-        self.projects = projects
+            while i < len(buff):
+                if '[remote "origin"]' in buff[i]:
+                    break
+                i += 1
+            i += 1
+            if i >= len(buff):
+                continue
 
-    def build_tree(self):
-        if len(self.projects) > 0:
-            projects = self.projects
+            line = buff[i].split(' ')
+            if len(line) > 2 and line[0] == '\turl' and line[2][:30] == 'http://git.axus-automation.fr/':
+                line[2] = 'git@git.axus-automation.fr:' + line[2][30:]
+                line = ' '.join(line)
+                print('fix:')
+                print(line)
+                buff[i] = line
 
+                shutil.copyfile(path, f'{path}.bak' )
 
-            out = []
-            for i in projects:
-                for j in projects[i]:
-                    original = j[1]
-                    if j[1][0] == self.slash:
-                        j[1] = j[1][1:]
-                    out.append([j[1], original])
+                file = open(path, 'w')
+                for i in buff:
+                    file.write(i)
 
-            projects = out
+                file.close()
 
-            home = projects[0][0].split(self.slash)[0]
+    def add_repos(self, repos):
+        """
+        Add a batch of found repos to the tree, the cached status is shown until they are checked
+        :param repos: {root: [repo path]}
+        """
+        projects = discovery.group_projects(repos)
+        out = []
+        for i in projects:
+            self.projects.append(projects[i])
+            for j in projects[i]:
+                original = j[1]
+                path = j[1]
+                if path[0] == self.slash:
+                    path = path[1:]
+                out.append([path, original])
+
+        if len(out) == 0:
+            return
 
+        if self.root is None:
+            home = out[0][0].split(self.slash)[0]
             self.root = Folder(home)
-
-            for i in projects:
-                repo = self.root.get_folder(i[0])
-                repo.os_path = i[1]
-                repo.make_repo()
-
             self.model.appendRow(self.root)
-            self.ui.folder_tree.setModel(self.model)
-            self.model.sort(0)
+            self.ui.folder_tree.setRootIndex(self.model.index(0, 0))
+            self.timing('first repo')
 
-            self.expand_all()
+        for i in out:
+            repo = self.root.get_folder(i[0])
+            repo.os_path = i[1]
+            repo.make_repo()
+            self.repo_items[repo.os_path] = repo
+            status = self.status_cache.get(repo.os_path)
+            if status is not None:
+                self.set_repo_status(repo, status)
+
+        self.model.sort(0)
+        self.ui.folder_tree.expandAll()
+        self.visible_timer.start()
 
     def update_branch(self, label=True):
         # print("update_branch()")
 
         if not self.update_brch_lock :
             self.update_brch_lock = True
+            path = self.path
             self.get_branches()
             self.get_remotes()
-            self.get_selected_branch()
-            self.process_branches()
+            # changes and current branch from the same git status
             self.check_changes()
+            if path != self.path:
+                # an other repo was selected while git was running, its update was skipped
+                self.update_brch_lock = False
+                self.update_branch(label)
+                return
+            self.get_selected_branch(self.work_status)
+            self.process_branches()
             self.ui.combo_branch.clear()
             self.ui.combo_branch.addItems(self.branches + ['--new--'])
             branches = self.branches
@@ -884,40 +1506,37 @@ class GitHUD(QMainWindow):
             txt = f'{self.section[0]} : {self.selected_branch}'
             if label:
                 self.set_label(txt)
+            status = self.work_status
+            if status.upstream is not None and (status.ahead or status.behind):
+                txt += f' (+{status.ahead} -{status.behind})'
+            tooltip = self.tracking_tooltip()
+            if path != self.path:
+                self.update_brch_lock = False
+                self.update_branch(label)
+                return
             self.ui.label_repo.setText(txt)
+            self.ui.label_repo.setToolTip(tooltip)
             self.update_brch_lock = False
             self.enable_buttons()
 
     def update_changes(self):
-        self.tree.clear()
-        if len(self.change_list) > 0 :
-            header = QTreeWidgetItem(self.tree)
-            header.setText(0, "---- Modified files ----")
-            self.tree_list = []
-
-            elmt = QTreeWidgetItem(self.tree)
-            elmt.setFlags(elmt.flags() | Qt.ItemIsUserCheckable)
-            elmt.setText(0, "-- All --")
-            elmt.setCheckState(0, Qt.Unchecked)
-
-            self.tree_list.append(elmt)
-            for i in self.change_list:
-                elmt = QTreeWidgetItem(self.tree)
-                elmt.setFlags(elmt.flags() | Qt.ItemIsUserCheckable)
-                elmt.setText(0,i)
-                diff = f"{i}\n{self.do_git_diff(i)}"
-                elmt.setToolTip(0, diff)
-                elmt.setCheckState(0, Qt.Unchecked)
-                self.tree_list.append(elmt)
-
-        if len(self.cached_change_list) > 0:
-            header = QTreeWidgetItem(self.tree)
-            header.setText(0, "---- Cached files ----")
-            for i in self.cached_change_list:
-
-                elmt = QTreeWidgetItem(self.tree)
-                elmt.setText(0, i)
-                elmt.setToolTip(0, i)
+        # the diff index is read with the Qt events still processed, the selection can change
+        path = self.path
+        if len(self.change_list) > 0:
+            self.load_diff_index(path)
+            if path != self.path:
+                return
+
+        cached = []
+        renamed = self.work_status.renamed
+        for i in self.cached_change_list:
+            if i in renamed:
+                cached.append(f'{renamed[i]} -> {i}')
+            else:
+                cached.append(i)
+
+        # check states of files still in the list are kept by the model
+        self.changes_model.set_changes(path, self.change_list, cached, self.work_status.conflicted)
 
     def on_branch_choice(self):
         # print("on_branch_choice()")
@@ -957,9 +1576,13 @@ class GitHUD(QMainWindow):
         if branch in self.local_branches:
             self.do_checkout(branch)
         else:
+            # stop if another repo is selected between two steps
+            path = self.path
             self.do_make_branch(branch)
-            self.do_checkout(branch)
-            self.do_pull()
+            if self.path == path:
+                self.do_checkout(branch)
+            if self.path == path:
+                self.do_pull()
         self.branch_chg_lock = False
 
     def on_pull(self):
@@ -969,6 +1592,16 @@ class GitHUD(QMainWindow):
         self.do_push()
 
     def on_commit(self):
+        return self.commit_selection()
+
+    def on_commit_push(self):
+        return self.commit_selection(push=True)
+
+    def commit_selection(self, push=False):
+
+        if self.changes_model.repo != self.path:
+            # change list not loaded yet for the selected repo
+            return False
 
         if len(self.cached_change_list) > 0 or len(self.change_list) > 0:
 
@@ -977,37 +1610,32 @@ class GitHUD(QMainWindow):
                 self.set_label(txt)
                 return False
 
-            for i in self.tree_list:
-
-                if (i.checkState(0) == Qt.CheckState.Checked) and i != self.tree_list[0]:
-                    if ' ' in i.text(0):
-                        if self.os == 'linux':
-                            filename = f"'{i.text(0)}'"
-                        else:
-                            filename = f'"{i.text(0)}"'
-                    else:
-                        filename = i.text(0)
-                    if not self.do_add(filename):
-                        return False
-
-            if not self.do_commit():
-                self.check_changes()
-                return False
+            files = self.untracked_files_of(self.changes_model.checked_files())
 
-            self.check_changes()
-            return True
+            return self.do_commit(files, push)
 
         else:
             txt = f'nothing to commit!'
             self.set_label(txt)
             return False
 
-    def on_commit_push(self):
-
-        if not self.on_commit():
-            return False
-
-        self.do_push()
+    def untracked_files_of(self, files):
+        """
+        Replace the collapsed untracked 'dir/' entries by their files not hidden by the ignore
+        filter, so nothing the user did not see is committed
+        :param files: [file]
+        :return: [file]
+        """
+        out = []
+        for i in files:
+            if not i.endswith('/'):
+                out.append(i)
+                continue
+            listed = self.changes_model.dir_files.get(i)
+            if listed is None:
+                listed = self.repo_status.list_untracked(self.path, i)
+            out += listed
+        return out
 
     def on_merge(self):
         _from = self.ui.combo_merge.currentText()
@@ -1018,27 +1646,33 @@ class GitHUD(QMainWindow):
             self.set_label(txt)
 
     def on_ignore(self):
+        if self.changes_model.repo != self.path:
+            return
 
-        for i in self.tree_list:
+        for i in self.changes_model.checked_files():
 
-            if (i.checkState(0) == Qt.CheckState.Checked):
-                if ' ' in i.text(0):
-                    filename = f"'{i.text(0)}'"
-                else:
-                    filename = i.text(0)
+            if ' ' in i:
+                filename = f"'{i}'"
+            else:
+                filename = i
 
-                self.do_ignore(filename)
+            self.do_ignore(filename)
 
         self.check_changes()
 
     def on_delete_file(self):
+        if self.changes_model.repo != self.path:
+            return
 
-        for i in self.tree_list:
-
-            if (i.checkState(0) == Qt.CheckState.Checked):
-
-                filename = i.text(0)
-                self.do_delete_file(filename)
+        path = self.path
+        for i in self.changes_model.checked_files():
+            if self.path != path:
+                # another repo selected while a confirmation was shown
+                break
+            if i.endswith('/'):
+                self.do_delete_dir(i)
+            else:
+                self.do_delete_file(i)
 
         self.check_changes()
 
@@ -1054,8 +1688,11 @@ class GitHUD(QMainWindow):
     def do_checkout(self, branch):
         self.get_selected_branch()
         if branch is not None and branch != '' and branch != self.selected_branch:
-            checkout = f'cd {self.path} {self.bash_2_and} git commit -m "change_branch" {self.bash_and} git checkout {branch}'
-            ret = subprocess.run(checkout, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            # the repo may be unselected while git run, every step stay in this one
+            path = self.path
+            self.git(['commit', '-m', 'change_branch'], path)
+            ret = self.git(['checkout', branch], path)
+            checkout = cmd_str(ret)
             if ret.returncode != 0:
                 tooltip = checkout + '\n     ==>    \n' + ret.stderr
                 self.set_label('Cannot change branch',tooltip)
@@ -1069,17 +1706,19 @@ class GitHUD(QMainWindow):
         # print("do_merge()")
 
         branch = self.ui.combo_branch.currentText()
+        path = self.path
 
-        cmd = f'cd {self.path} {self.bash_2_and} git merge {_from}'
-        if branch == 'master' or branch == 'main':
-            cmd += f' {self.bash_2_and} git branch --delete {_from}'
+        ret = self.git(['merge', _from], path)
+        cmd = cmd_str(ret)
+        if ret.returncode == 0 and (branch == 'master' or branch == 'main'):
+            ret = self.git(['branch', '--delete', _from], path)
+            cmd += ' && ' + cmd_str(ret)
 
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
         if ret.returncode != 0:
             tooltip = cmd + '\n     ==>    \n' + ret.stderr
             txt = f'merge fail!'
             self.set_label(txt, tooltip)
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return False
         else:
             txt = f'merged successfully'
@@ -1087,45 +1726,47 @@ class GitHUD(QMainWindow):
             self.set_label(txt, tooltip)
             # self.update_section()
             self.update_branch()
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return True
 
     def do_restore(self):
-        cmd = f'cd {self.path} {self.bash_2_and} git restore .'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        path = self.path
+        ret = self.git(['restore', '.'], path)
+        cmd = cmd_str(ret)
 
         if ret.returncode != 0:
             tooltip = cmd + '\n     ==>    \n' + ret.stderr
             txt = f'delete fail!'
             self.set_label(txt, tooltip)
             self.update_branch()
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return False
         else:
             txt = f'delete successfully'
             tooltip = cmd + '\n     ==>    \n' + ret.stdout
             self.set_label(txt, tooltip)
             self.update_branch()
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return True
 
     def do_reset(self):
-        cmd = f'cd {self.path} {self.bash_2_and} git reset'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        path = self.path
+        ret = self.git(['reset'], path)
+        cmd = cmd_str(ret)
 
         if ret.returncode != 0:
             tooltip = cmd + '\n     ==>    \n' + ret.stderr
             txt = f'reset fail!'
             self.set_label(txt, tooltip)
             self.update_branch()
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return False
         else:
             txt = f'reset successfully'
             tooltip = cmd + '\n     ==>    \n' + ret.stdout
             self.set_label(txt, tooltip)
             self.update_branch()
-            self.check_single_status(self.path)
+            self.check_single_status(path)
             return True
 
     def do_ignore(self,file):
@@ -1152,9 +1793,7 @@ class GitHUD(QMainWindow):
         print([path])
 
         try:
-            print("a")
             os.remove(path)
-            print("b")
             self.check_single_status(self.path)
             return True
         except Exception as e:
@@ -1163,9 +1802,50 @@ class GitHUD(QMainWindow):
             self.check_single_status(self.path)
             return False
 
+    def do_delete_dir(self, folder):
+        """
+        Delete the files of a collapsed untracked dir the change list show, after a confirmation
+        naming the dir. Ignored and hidden files are kept, a dir holding a nested repo is refused.
+        :param folder: 'dir/' entry of the change list
+        """
+        path = self.path
+        root = path + self.slash + folder.rstrip('/')
+        files = self.untracked_files_of([folder])
+        nested = [i for i in files if i.endswith('/')]
+        if os.path.exists(root + self.slash + '.git') or len(nested) > 0:
+            txt = f"cannot delete {folder}!"
+            tooltip = f"{folder} hold a nested repository: {', '.join(nested) or folder}"
+            self.set_label(txt, tooltip)
+            return False
+
+        if not self.popup_delete_dir(folder, len(files)) or self.path != path:
+            return False
+
+        errors = []
+        for i in files:
+            try:
+                os.remove(path + self.slash + i)
+            except OSError as e:
+                errors.append(str(e))
+
+        # dirs left empty are removed, deepest first, never above the deleted one
+        dirs = sorted({os.path.dirname(path + self.slash + i) for i in files}, key=len, reverse=True)
+        for i in dirs:
+            while os.path.commonpath([i, root]) == root:
+                try:
+                    os.rmdir(i)
+                except OSError:
+                    break
+                i = os.path.dirname(i)
+
+        if len(errors) > 0:
+            self.set_label(f"cannot remove {len(errors)} files!", '\n'.join(errors))
+        self.check_single_status(path)
+        return len(errors) == 0
+
     def do_add(self,file):
-        cmd = f'cd {self.path} {self.bash_2_and} git add {file}'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        ret = self.git(['add', '--', file])
+        cmd = cmd_str(ret)
         if ret.returncode != 0:
             tooltip = cmd + '\n     ==>    \n' + ret.stderr
             txt = f'add fail!'
@@ -1177,64 +1857,185 @@ class GitHUD(QMainWindow):
             self.set_label(txt, tooltip)
             return True
 
-    def do_commit(self):
+    def do_commit(self, files, push=False):
+        """
+        Stage files and commit them in GitHUD.job, off the GUI thread, result goes to ret_commit()
+        :param files: files to add before commit, already staged files are committed too
+        :param push: push after a successful commit
+        """
         msg = self.ui.msg.text()
         if msg == '':
             txt = f'a message i needed for commit!'
             self.set_label(txt)
             return False
 
-        cmd = f'cd {self.path} {self.bash_2_and} git commit -m "{msg}"'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if self.job.is_running:
+            return False
+
+        steps = []
+        if len(files) > 0:
+            # whole selection staged by one git call, paths given NUL separated on stdin
+            add = ['--literal-pathspecs', 'add', '--pathspec-from-file=-', '--pathspec-file-nul']
+            steps.append((add, '\0'.join(files)))
+        steps.append((['commit', '-m', msg], None))
+
+        self.job_action = 'do_commit'
+        self.commit_push = push
+        self.job.start_chain(steps, self.path)
+        self.start_progress()
+        return True
+
+    def ret_commit(self, ret):
         if ret.returncode != 0:
-            tooltip = cmd + '\n     ==>    \n' + ret.stderr
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stderr
             txt = f'commit fail!'
             self.set_label(txt, tooltip)
-            self.check_single_status(self.path)
-            return False
+            push = False
         else:
             txt = f'commit done successfull'
-            tooltip = cmd + '\n     ==>    \n' + ret.stdout
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stdout
             self.set_label(txt, tooltip)
             self.ui.msg.setText('')
-            self.check_single_status(self.path)
-            return True
+            push = self.commit_push
+        self.job.cmd = ''
+        self.job_action = None
+        self.commit_push = False
+        self.check_changes()
+        self.check_single_status(self.path)
+        if push:
+            self.do_push()
+
+    def load_diff_index(self, path):
+        """
+        Blob ids and line counts of every modified file, one git call per change list refresh
+        :param path: repo os path, nothing is stored if it is not the selected repo anymore
+        """
+        ret = self.git(INDEX_ARGS, path)
+        if path != self.path:
+            return
+        if ret.returncode != 0:
+            self.diff_index = {}
+        else:
+            self.diff_index = parse_index(ret.stdout)
+
+    def is_diffable(self, entry):
+        return not entry.binary and entry.added + entry.deleted <= self.max_diff_lines
+
+    def diff_tooltip(self, file):
+        entry = self.diff_index.get(file)
+        if entry is None:
+            # untracked file
+            return ''
+        if entry.binary:
+            return 'binary file, diff not done'
+        if not self.is_diffable(entry):
+            return f'+{entry.added} -{entry.deleted} lines, diff not done'
+
+        key = entry.key(self.path)
+        if self.hovered_diff is not None and self.hovered_diff[0] == key:
+            return self.hovered_diff[1]
+        diff = self.diff_cache.get(key)
+        if diff is not None:
+            return diff
+
+        # the tooltip is shown again by on_diff_ready() once git is done
+        job = self.diff_job
+        if job is None or job[0] != self.path or file not in job[1]:
+            self.do_git_diff(file)
+        return 'loading diff...'
 
     def do_git_diff(self, file):
-        if not '.ods' in file and not '.odg' in file and not '.odt' in file and not '.Z3PRT' in file \
-                and not '.Z3ASM' in file and not '.exe' in file and not '.Z3DRW' in file and not '.stp' in file \
-                and not '.step' in file and not '.xrs' in file and not '.pdf' in file:
-            print(f"do_git_diff({file})")
-            cmd = f'cd {self.path} {self.bash_2_and} git diff {file}'
-            ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            if ret.returncode != 0:
-                return 'git diff fail!'
+        """
+        Diff of the hovered file and of other text files not in cache in one background git
+        call, the batch is kept within the cache size so it can't evict the hovered file
+        :param file: hovered file
+        """
+        if self.diff_job is not None:
+            # superseded by a file not in its batch
+            self.diff_job[3].cancel()
+
+        # rough size of a diff: changed lines plus context, 100 bytes a line
+        budget = self.diff_cache.max_size
+        entry = self.diff_index[file]
+        keys = {file: entry.key(self.path)}
+        budget -= (entry.added + entry.deleted + 6) * 100
+        for entry in self.diff_index.values():
+            if entry.path == file or not self.is_diffable(entry):
+                continue
+            size = (entry.added + entry.deleted + 6) * 100
+            if size > budget:
+                continue
+            key = entry.key(self.path)
+            if key not in self.diff_cache:
+                keys[entry.path] = key
+                budget -= size
+
+        print(f"do_git_diff({len(keys)} files)")
+        args = ['-c', 'core.quotepath=off', '--literal-pathspecs', 'diff', '--no-renames', '--'] + list(keys)
+        future = self.git_engine.submit(args, self.path)
+        job = (self.path, keys, file, future)
+        self.diff_job = job
+        future.add_done_callback(lambda f: self.diff_ready.emit(job))
+        # the git process is killed if it takes too long
+        QTimer.singleShot(10000, future.cancel)
+
+    def on_diff_ready(self, job):
+        repo, keys, file, future = job
+        if self.diff_job is job:
+            self.diff_job = None
+        if future.cancelled():
+            return
+
+        diffs = {}
+        try:
+            ret = future.result()
+            if ret.returncode == 0:
+                diffs = split_diff(ret.stdout)
             else:
-                return ret.stdout
-        else:
-            return "diff not done"
+                print(f"do_git_diff() fail: {ret.stderr}")
+        except Exception as e:
+            print(f"do_git_diff() fail: {e}")
+
+        for path, diff in diffs.items():
+            if path in keys and path != file:
+                self.diff_cache.put(keys[path], diff)
+        # the hovered file last, it is the most recent entry of the LRU
+        diff = diffs.get(file, 'git diff fail!')
+        if file in diffs:
+            self.diff_cache.put(keys[file], diff)
+        self.hovered_diff = (keys[file], diff)
+
+        # refresh the tooltip if the mouse is still on the file
+        if repo != self.path:
+            return
+        viewport = self.tree.viewport()
+        position = viewport.mapFromGlobal(QCursor.pos())
+        index = self.tree.indexAt(position)
+        if index.isValid() and viewport.rect().contains(position) and index.data() == file:
+            QToolTip.showText(QCursor.pos(), index.data(Qt.ToolTipRole), viewport)
 
-    def bash_ret(self, ret):
+    def job_ret(self, ret):
+        self.end_progress()
 
-        if self.bash_action == 'do_pull':
+        if self.job_action == 'do_pull':
             self.ret_pull(ret)
 
-        elif self.bash_action == 'do_push':
+        elif self.job_action == 'do_push':
             self.ret_push(ret)
 
+        elif self.job_action == 'do_commit':
+            self.ret_commit(ret)
+
     def do_pull(self):
-        if not self.pull_lock and not self.bash.is_running:
+        if not self.pull_lock and not self.job.is_running:
             self.pull_lock = True
 
             self.get_selected_branch()
             self.check_changes()
             if len(self.change_list) == 0 :
                 self.set_label(f"Start pull on branch : {self.selected_branch}")
-                cmd = f'cd {self.path} {self.bash_2_and} git pull origin {self.selected_branch}'
-
-                self.bash_action = 'do_pull'
-                self.bash.cmd = cmd
-                self.bash.start()
+                self.job_action = 'do_pull'
+                self.job.start(['pull', '--progress', 'origin', self.selected_branch], self.path, progress=True)
                 self.start_progress()
 
             else:
@@ -1246,51 +2047,47 @@ class GitHUD(QMainWindow):
     def ret_pull(self, ret):
         # print("ret_pull()")
         if ret.returncode != 0:
-            tooltip = self.bash.cmd + '\n     ==>    \n' + ret.stderr
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stderr
             txt = f'{self.section[0]} : {self.selected_branch} Cannot pull!'
             self.set_label(txt, tooltip)
 
         else:
             txt = f'{self.section[0]} : {self.selected_branch} is up to date'
-            tooltip = self.bash.cmd + '\n     ==>    \n' + ret.stdout
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stdout
             self.set_label(txt, tooltip)
         self.update_branch(label=False)
-        self.bash.cmd = ''
-        self.bash_action = None
+        self.job.cmd = ''
+        self.job_action = None
         self.check_single_status(self.path)
         self.pull_lock = False
 
     def do_push(self):
-        if not self.bash.is_running:
-            cmd = f'cd {self.path} {self.bash_2_and} git push origin {self.selected_branch}'
-
-            self.bash_action = 'do_push'
-            self.bash.cmd = cmd
-            self.bash.start()
+        if not self.job.is_running:
+            self.job_action = 'do_push'
+            self.job.start(['push', '--progress', 'origin', self.selected_branch], self.path, progress=True)
             self.start_progress()
-        # ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
     def ret_push(self, ret):
         if ret.returncode != 0:
-            tooltip = self.bash.cmd + '\n     ==>    \n' + ret.stderr
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stderr
             txt = f'push fail!'
             self.set_label(txt, tooltip)
-            self.bash.cmd = ''
-            self.bash_action = None
+            self.job.cmd = ''
+            self.job_action = None
             self.check_single_status(self.path)
             return False
         else:
             txt = f'push done successfull'
-            tooltip = self.bash.cmd + '\n     ==>    \n' + ret.stdout
+            tooltip = self.job.cmd + '\n     ==>    \n' + ret.stdout
             self.set_label(txt, tooltip)
-            self.bash.cmd = ''
-            self.bash_action = None
+            self.job.cmd = ''
+            self.job_action = None
             self.check_single_status(self.path)
             return True
 
     def do_add_branch(self,name):
-        cmd = f'cd {self.path} {self.bash_2_and} git branch {name}'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        ret = self.git(['branch', name])
+        cmd = cmd_str(ret)
         if ret.returncode != 0:
             tooltip = cmd + '\n     ==>    \n' + ret.stderr
             txt = f'cannot create branch!'
@@ -1305,8 +2102,8 @@ class GitHUD(QMainWindow):
     def do_make_branch(self,branch):
         self.get_branches()
         if branch not in self.local_branches and branch is not None and branch != '':
-            cmd = f'cd {self.path} {self.bash_2_and} git branch {branch}'
-            ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            ret = self.git(['branch', branch], self.path)
+            cmd = cmd_str(ret)
             if ret.returncode != 0:
                 tooltip = cmd + '\n     ==>    \n' + ret.stderr
                 txt = 'Cannot make branch!'
@@ -1325,8 +2122,12 @@ class GitHUD(QMainWindow):
     def do_delete_branch(self, branch):
 
         if branch != 'master' and branch != 'main':
-            cmd = f'cd {self.path} {self.bash_2_and} git checkout master {self.bash_2_and} git branch -D {branch}'
-            ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            path = self.path
+            ret = self.git(['checkout', 'master'], path)
+            cmd = cmd_str(ret)
+            if ret.returncode == 0:
+                ret = self.git(['branch', '-D', branch], path)
+                cmd += ' && ' + cmd_str(ret)
             if ret.returncode != 0:
                 tooltip = cmd + '\n     ==>    \n' + ret.stderr
                 txt = 'Cannot delete branch!'
@@ -1348,49 +2149,44 @@ class GitHUD(QMainWindow):
         else:
             self.ui.label.setToolTip(txt)
 
-    def get_selected_branch(self):
-        path = self.path + self.slash +'.git' + self.slash +'HEAD'
-        if os.path.exists(path):
-            file = open(path,'r')
-            line = file.readline()
-            self.selected_branch = line.split('/')[-1][:-1]
+    def tracking_tooltip(self):
+        """
+        Ahead/behind of every local branch of the selected repo
+        """
+        lines = []
+        for branch, i in sorted(self.repo_status.get_tracking(self.path).items()):
+            if i['remote'] is None:
+                lines.append(f"{branch}: no upstream")
+            elif i['gone']:
+                lines.append(f"{branch} -> {i['remote']}/{i['remote_branch']}: gone")
+            else:
+                lines.append(f"{branch} -> {i['remote']}/{i['remote_branch']}: "
+                             f"ahead {i['ahead']}, behind {i['behind']}")
+        return '\n'.join(lines)
+
+    def get_selected_branch(self, status=None):
+        """
+        :param status: WorkStatus of self.path, HEAD is read from .git if None
+        """
+        if status is not None and status.head is not None:
+            self.selected_branch = status.head
+            return
+        refs = self.refs.snapshot(self.path)
+        if refs.detached:
+            self.selected_branch = refs.head_sha
         else:
-            self.selected_branch = None
+            self.selected_branch = refs.head
 
     def get_branches(self):
-        branches_path = self.path +  self.slash + '.git' + self.slash +'refs' + self.slash + 'heads'
-        content = os.listdir(branches_path)
-        branches = []
-        for i in content:
-            p = branches_path + self.slash + i
-            if os.path.isfile(p):
-                branches.append(i)
+        branches = sorted(self.refs.snapshot(self.path).heads)
         self.branches = branches
         self.local_branches = branches
 
     def get_remotes(self):
         # print('get_remotes()')
-        remotes_path = self.path + self.slash +'.git' + self.slash +'refs'+ self.slash +'remotes'
-        if not os.path.exists(remotes_path):
-            self.remotes = None
-            return
-        content = os.listdir(remotes_path)
-        remotes_list = []
         remotes = {}
-        for i in content:
-            p = remotes_path + self.slash + i
-            if os.path.isdir(p):
-                remotes_list.append(i)
-
-        for i in remotes_list:
-            branches_path = self.path + self.slash +'.git' + self.slash + 'refs' + self.slash +'remotes' + self.slash + i
-            content = os.listdir(branches_path)
-            branches = []
-            for j in content:
-                p = branches_path + self.slash + j
-                if os.path.isfile(p) and j != 'HEAD':
-                    branches.append(j)
-            remotes[i] = branches
+        for remote, branches in self.refs.snapshot(self.path).remotes.items():
+            remotes[remote] = sorted(branches)
         # print(remotes)
         self.remotes = remotes
 
@@ -1408,78 +2204,42 @@ class GitHUD(QMainWindow):
         if path is None:
             path = self.path
             update = True
+            self.changes_busy = True
         else:
             update = False
 
-        cmd = f'cd {path} {self.bash_2_and} git ls-files -m -d -o -z --exclude-standard'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=False, text=True)
-
-        changes = ret.stdout.split('\0')
-        if changes[-1] == '':
-            changes = changes[: -1]
+        status = self.repo_status.get_work_status(path)
+        out = self.repo_status.list_changes(path, status)
         print("changes received")
-        out = []
-        for i in changes:
-            # is_lock = False
-            is_ignored = False
-
-            for fil in self.ignore:
-                if type(fil) is str:
-                    if fil in i.split("/")[-1]:
-                        is_ignored = True
-                if type(fil) is list:
-                    count = 0
-                    for f in fil:
-                        if f in i.split("/")[-1]:
-                            count += 1
-                    if len(fil) == count:
-                        is_ignored = True
-
-            # hide jetbrains config files (Pycharm, CLion, etc....)
-            if i.split("/")[0] == '.idea':
-                is_ignored = True
-
-            # hide anything in __pycache__ folders
-            pth = i.split("/")[:-1]
-            for p in pth:
-                if p == '__pycache__':
-                    is_ignored = True
-
-            # hide python venv folder
-            if i.split("/")[0] == 'venv':
-                is_ignored = True
-
-            if i != '' and not is_ignored:
-                out.append(i)
-        out = list(set(out))
-                    
+
+        if update and path != self.path:
+            # an other repo was selected while git was running, the result belong to the old one
+            self.changes_busy = False
+            return out
+
         if path_none:
             for i in out:
                 print(f"    {i}")
 
         if update:
+            self.work_status = status
             self.change_list = out
             self.change_list.sort(key=str.lower)
-            self.check_cached_changes()
+            self.check_cached_changes(status=status)
 
             self.update_changes()
+            self.changes_busy = False
 
         return out
 
-    def check_cached_changes(self, path=None):
+    def check_cached_changes(self, path=None, status=None):
         if path is None:
             path = self.path
             update = True
         else:
             update = False
 
-        cmd = f'cd {path} {self.bash_2_and} git diff --name-only --cached'
-        ret = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=False, text=True)
-        changes = ret.stdout.split('\n')
-        out = []
-        for i in changes:
-            if i != '':
-                out.append(i)
+        out = self.repo_status.list_cached_changes(path, status)
         if update:
             self.cached_change_list = out
             self.cached_change_list.sort(key=str.lower)
@@ -1544,6 +2304,16 @@ class GitHUD(QMainWindow):
         msg.setIcon(QMessageBox.Information)
         msg.exec_()
 
+    def popup_delete_dir(self, folder, count):
+        msg = QMessageBox()
+        msg.setWindowTitle("Delete untracked dir!")
+        msg.setText(f"Delete the {count} untracked files shown in {folder} ?\n"
+                    f"Ignored files and the files hidden from the change list are kept.")
+        msg.setIcon(QMessageBox.Warning)
+        msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
+        msg.setDefaultButton(QMessageBox.No)
+        return msg.exec_() == QMessageBox.Yes
+
     def popup_enter_commit_msg(self):
         msg = QMessageBox()
         msg.setWindowTitle("Enter commit msg!!")
@@ -1566,6 +2336,68 @@ class GitHUD(QMainWindow):
         msg.setIcon(QMessageBox.Information)
         msg.exec_()
 
+    def selected_repos(self, position=None):
+        """
+        Repos of the folder tree selection, a folder stand for all the repos under it
+        :param position: if nothing is selected, the item at this viewport position is used
+        :return: [repo os path]
+        """
+        tree = self.ui.folder_tree
+        indexes = tree.selectionModel().selectedIndexes()
+        if len(indexes) == 0 and position is not None and tree.indexAt(position).isValid():
+            indexes = [tree.indexAt(position)]
+        paths = {}
+        for index in indexes:
+            for i in self.model.itemFromIndex(index).repos():
+                paths[i] = None
+        return list(paths)
+
+    def folder_context_menu(self, position):
+        paths = self.selected_repos(position)
+        if len(paths) == 0:
+            return
+
+        context_menu = QMenu(self.ui.folder_tree)
+        running = self.fleet_run.isRunning()
+        actions = {}
+        for op, text in [(FETCH, 'Fetch'), (PULL, 'Pull (fast-forward)'), (PUSH, 'Push')]:
+            action = context_menu.addAction(f"{text} {len(paths)} repos")
+            action.setEnabled(not running)
+            actions[action] = op
+        cancel = None
+        if running:
+            context_menu.addSeparator()
+            cancel = context_menu.addAction(f"Cancel {self.fleet_run.op}")
+
+        action = context_menu.exec_(self.ui.folder_tree.viewport().mapToGlobal(position))
+        if action is None:
+            return
+        if action == cancel:
+            self.fleet.cancel()
+        elif action in actions:
+            self.do_fleet(actions[action], paths)
+
+    def do_fleet(self, op, paths):
+        if self.fleet_run.isRunning():
+            return
+        self.fleet_count = 0
+        self.set_label(f"{op} 0/{len(paths)} repos")
+        self.fleet_run.start_op(op, paths)
+
+    def on_fleet_result(self, result):
+        self.fleet_count += 1
+        self.set_label(f"{result.op} {self.fleet_count}/{len(self.fleet_run.paths)} repos")
+        if result.state == OK:
+            self.check_single_status(result.path)
+
+    def on_fleet_done(self, results):
+        text, tooltip = summary(self.fleet_run.op, results)
+        print(tooltip)
+        self.set_label(text, tooltip)
+        for i in results:
+            if i.path == self.path and i.state == OK and self.repo_selected:
+                self.update_branch(label=False)
+
     def tree_context_menu(self, position):
 
         context_menu = QMenu(self.tree)
@@ -1574,10 +2406,10 @@ class GitHUD(QMainWindow):
         action = context_menu.exec_(self.tree.mapToGlobal(position))
         if action is not None:
             if action == act1:
-                print(f'show diff of {self.tree.itemAt(position).text(0)}!')
+                print(f'show diff of {self.tree.indexAt(position).data()}!')
 
 
-if __name__ == "__main__":
+def run():
     QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts)
     app = QApplication([])
     app.setStyle("Fusion")
@@ -1605,5 +2437,8 @@ if __name__ == "__main__":
 
     clipboard = app.clipboard()
 
-    sys.exit(app.exec_())
+    return app.exec_()
 
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,262 @@
+import os
+import re
+import threading
+
+
+def git_dir(repo):
+    """
+    .git dir of a repo, follow the 'gitdir: ...' file of worktrees and submodules
+    """
+    path = os.path.join(repo, '.git')
+    if os.path.isfile(path):
+        with open(path, 'r') as f:
+            line = f.readline().strip()
+        if line.startswith('gitdir:'):
+            path = os.path.normpath(os.path.join(repo, line[7:].strip()))
+    return path
+
+
+class Refs:
+    """
+    Snapshot of every ref of a repo
+    """
+
+    def __init__(self):
+        self.head = None  # current branch name, None if detached
+        self.head_sha = None
+        self.detached = False
+        self.heads = {}  # branch => sha
+        self.remotes = {}  # remote => {branch => sha}
+        self.tags = {}  # tag => sha
+        self.upstreams = {}  # branch => (remote, remote branch)
+
+    def __repr__(self):
+        return f'Refs(head={self.head}, detached={self.detached}, heads={len(self.heads)}, ' \
+               f'remotes={list(self.remotes)}, tags={len(self.tags)})'
+
+    def upstream(self, branch):
+        """
+        Remote tracking branch of a local branch: the configured upstream, or the branch
+        with the same name on origin
+        :return: (remote, remote branch) or None
+        """
+        if branch in self.upstreams:
+            return self.upstreams[branch]
+        if branch in self.remotes.get('origin', {}):
+            return 'origin', branch
+        return None
+
+    def upstream_sha(self, branch):
+        upstream = self.upstream(branch)
+        if upstream is None:
+            return None
+        return self.remotes.get(upstream[0], {}).get(upstream[1])
+
+
+class RefStore:
+    """
+    Pure python read of loose refs, packed-refs and HEAD, cached by file mtime.
+
+    A loose refs dir is listed again only if its mtime changed (git always write a ref
+    with a lock file renamed into place, so the dir mtime move on each update),
+    packed-refs, HEAD and config are parsed again only if their mtime changed.
+    """
+
+    def __init__(self):
+        self.files = {}  # path => (mtime, data)
+        self.dirs = {}  # path => (mtime, {name => value}, [sub dirs])
+        self.lock = threading.Lock()
+
+    def snapshot(self, repo):
+        """
+        :param repo: repo os path
+        :return: Refs
+        """
+        path = git_dir(repo)
+        refs = Refs()
+
+        with self.lock:
+            loose = {}
+            self.read_loose(os.path.join(path, 'refs'), 'refs/', loose)
+            packed = self.cached_file(os.path.join(path, 'packed-refs'), parse_packed_refs) or {}
+            head = self.cached_file(os.path.join(path, 'HEAD'), parse_ref_file)
+            config = self.cached_file(os.path.join(path, 'config'), parse_upstreams) or {}
+
+        # loose refs override packed ones
+        all_refs = dict(packed)
+        all_refs.update(loose)
+
+        for name, value in all_refs.items():
+            # symbolic refs like refs/remotes/origin/HEAD
+            if value.startswith('ref:'):
+                continue
+            if name.startswith('refs/heads/'):
+                refs.heads[name[11:]] = value
+            elif name.startswith('refs/remotes/'):
+                remote, _, branch = name[13:].partition('/')
+                if branch != '':
+                    refs.remotes.setdefault(remote, {})[branch] = value
+            elif name.startswith('refs/tags/'):
+                refs.tags[name[10:]] = value
+
+        if head is not None:
+            if head.startswith('ref:'):
+                target = head[4:].strip()
+                if target.startswith('refs/heads/'):
+                    refs.head = target[11:]
+                refs.head_sha = all_refs.get(target)
+            else:
+                refs.detached = True
+                refs.head_sha = head
+
+        refs.upstreams = config
+        return refs
+
+    def cached_file(self, path, parse):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self.files.pop(path, None)
+            return None
+        cached = self.files.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, 'r') as f:
+                    data = parse(f.read())
+            except OSError:
+                return None
+            cached = (mtime, data)
+            self.files[path] = cached
+        return cached[1]
+
+    def read_loose(self, folder, prefix, out):
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return
+        cached = self.dirs.get(folder)
+        if cached is None or cached[0] != mtime:
+            refs = {}
+            sub_dirs = []
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_dirs.append(entry.name)
+                        elif not entry.name.endswith('.lock'):
+                            try:
+                                with open(entry.path, 'r') as f:
+                                    refs[entry.name] = parse_ref_file(f.read())
+                            except OSError:
+                                continue
+            except OSError:
+                return
+            cached = (mtime, refs, sub_dirs)
+            self.dirs[folder] = cached
+
+        for name, value in cached[1].items():
+            if value is not None:
+                out[prefix + name] = value
+        for i in cached[2]:
+            self.read_loose(os.path.join(folder, i), prefix + i + '/', out)
+
+
+def parse_ref_file(data):
+    data = data.strip()
+    if data == '':
+        return None
+    return data
+
+
+def parse_packed_refs(data):
+    refs = {}
+    for line in data.splitlines():
+        # header and peeled tags
+        if line == '' or line[0] in '#^':
+            continue
+        sha, _, name = line.partition(' ')
+        refs[name.strip()] = sha
+    return refs
+
+
+SECTION = re.compile(r'^\s*\[\s*branch\s+"(.+)"\s*\]')
+
+
+def parse_upstreams(data):
+    """
+    branch.<name>.remote & branch.<name>.merge of a .git/config
+    :return: {branch => (remote, remote branch)}
+    """
+    upstreams = {}
+    branches = {}
+    branch = None
+    for line in data.splitlines():
+        line = line.strip()
+        if line == '' or line[0] in '#;':
+            continue
+        if line[0] == '[':
+            match = SECTION.match(line)
+            branch = match.group(1) if match else None
+            if branch is not None:
+                branches.setdefault(branch, {})
+            continue
+        if branch is None:
+            continue
+        key, _, value = line.partition('=')
+        branches[branch][key.strip().lower()] = value.strip().strip('"')
+
+    for name, values in branches.items():
+        remote = values.get('remote')
+        merge = values.get('merge')
+        if remote is None or merge is None or remote == '.':
+            continue
+        if merge.startswith('refs/heads/'):
+            merge = merge[11:]
+        upstreams[name] = (remote, merge)
+    return upstreams
+
+
+def parse_ls_remote(data):
+    """
+    Parse `git ls-remote --heads` output
+    :return: {branch => sha}
+    """
+    heads = {}
+    for line in data.splitlines():
+        sha, _, name = line.partition('\t')
+        if name.startswith('refs/heads/'):
+            heads[name[11:]] = sha
+    return heads
+
+
+# one line per local branch: name, sha, upstream remote, upstream branch, ahead/behind
+TRACKING_ARGS = ['for-each-ref', '--format=%(refname)%00%(objectname)%00%(upstream:remotename)%00'
+                 '%(upstream:remoteref)%00%(upstream:track,nobracket)', 'refs/heads']
+
+TRACK = re.compile(r'(ahead|behind) (\d+)')
+
+
+def parse_tracking(data):
+    """
+    Parse `git for-each-ref` output of TRACKING_ARGS
+    :return: {branch => {'sha', 'remote', 'remote_branch', 'ahead', 'behind', 'gone'}}
+    """
+    branches = {}
+    for line in data.splitlines():
+        fields = line.split('\0')
+        if len(fields) != 5 or not fields[0].startswith('refs/heads/'):
+            continue
+        name, sha, remote, merge, track = fields
+        entry = {'sha': sha, 'remote': None, 'remote_branch': None, 'ahead': None, 'behind': None,
+                 'gone': False}
+        if remote not in ('', '.') and merge.startswith('refs/heads/'):
+            entry['remote'] = remote
+            entry['remote_branch'] = merge[11:]
+            entry['gone'] = track == 'gone'
+            if not entry['gone']:
+                entry['ahead'] = 0
+                entry['behind'] = 0
+                for key, count in TRACK.findall(track):
+                    entry[key] = int(count)
+        branches[name[11:]] = entry
+    return branches
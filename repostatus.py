@@ -0,0 +1,392 @@
+import re
+import threading
+
+from statuscache import fingerprint
+from refs import parse_ls_remote, parse_tracking, TRACKING_ARGS
+from gitindex import scan_worktree
+from gitstatus import STATUS_ARGS, WorkStatus, parse_status
+
+
+# over this many entries the stat data can't decide, one git status is cheaper than a diff on each
+MAX_AMBIGUOUS = 200
+
+
+class RepoStatus:
+    """
+    Status of repositories (need pull/push/commit, changes), shared by the GUI and the
+    headless scan, nothing here touch Qt.
+
+    git is a callable(args, path) => subprocess.CompletedProcess, the GUI give its own
+    GitHUD.git() that keep the window alive, the headless scan give GitEngine.run().
+    """
+
+    def __init__(self, git, refs, ignore, cache=None, remote_probe='ls-remote', untracked='normal'):
+        """
+        :param ignore: IgnoreFilter of the change list
+        :param untracked: 'normal' report untracked dirs as one 'dir/' entry, 'all' list every file
+        """
+        self.git = git
+        self.refs = refs
+        self.ignore = ignore
+        self.cache = cache
+        self.untracked = untracked
+        # 'ls-remote' only ask the remote refs, 'fetch' do a fetch dry run
+        self.remote_probe = remote_probe
+        # {path: (refs key, tracking summary)}
+        self.tracking_cache = {}
+        # last answer of the remotes {path: (remote tracking branches key, need_pull)}
+        self.probes = {}
+        self.lock = threading.Lock()
+
+    def get_cached_status(self, path, force=False):
+        """
+        Same as get_status() but the remotes are not asked if the repo fingerprint (HEAD,
+        refs, packed-refs, index) did not change since last check, the fingerprint can't see
+        the worktree so need_commit is always checked again
+        :param path: os path of the repository
+        :param force: ignore the cached status
+        :return: status dict
+        """
+        if self.cache is None:
+            return self.get_status(path)
+
+        # fingerprint taken before the check, a change during the check will be seen next time
+        key = fingerprint(path)
+        if not force:
+            status = self.cache.get(path, key)
+            if status is not None:
+                status = dict(status)
+                status['need_commit'] = self.check_commit_status(path)
+                self.cache.set(path, key, status)
+                return status
+
+        status = self.get_status(path)
+        if status['error']:
+            self.cache.remove(path)
+        else:
+            self.cache.set(path, key, status)
+        return status
+
+    def get_status(self, path, probe=True):
+        """
+        Collect the status of a repository, does not touch the tree so it can run in a worker thread
+        :param path: os path of the repository
+        :param probe: see get_pull_status()
+        :return: {'need_pull': bool, 'need_push': bool, 'need_commit': bool, 'error': bool}
+        """
+        # print(f"get_status({path})--------------------------------")
+        status = {'need_pull': False, 'need_push': False, 'need_commit': False, 'error': False}
+        status['need_pull'], status['error'] = self.get_pull_status(path, probe)
+        status['need_push'] = self.check_push_status(path)
+        status['need_commit'] = self.check_commit_status(path)
+        return status
+
+    def get_local_status(self, path):
+        """
+        Same as get_status() without asking the remotes again, for the checks run on each
+        change the watcher see: a file save must not cost a network round trip
+        :param path: os path of the repository
+        :return: status dict
+        """
+        key = fingerprint(path) if self.cache is not None else None
+        status = self.get_status(path, probe=False)
+        if self.cache is not None:
+            if status['error']:
+                self.cache.remove(path)
+            else:
+                self.cache.set(path, key, status)
+        return status
+
+    def get_remote_status(self, path):
+        """
+        Same as get_cached_status() but the remotes are always asked, the ref derived part of
+        the status is reused if the repo fingerprint did not change: new commits on the remotes
+        change nothing in the repo, so the watcher can't see them
+        :param path: os path of the repository
+        :return: status dict
+        """
+        if self.cache is None:
+            return self.get_status(path)
+
+        key = fingerprint(path)
+        status = self.cache.get(path, key)
+        if status is None:
+            return self.get_cached_status(path, force=True)
+
+        status = dict(status)
+        status['need_commit'] = self.check_commit_status(path)
+        status['need_pull'], status['error'] = self.get_pull_status(path)
+        if status['error']:
+            self.cache.remove(path)
+        else:
+            self.cache.set(path, key, status)
+        return status
+
+    def get_pull_status(self, path, probe=True):
+        """
+        :param probe: False to reuse the last answer of the remotes, it still hold while the
+                      remote tracking branches did not move, after a fetch/pull they are up to
+                      date, the remotes are only asked if they never were
+        :return: (need_pull, error)
+        """
+        remotes = remotes_key(self.refs.snapshot(path))
+        with self.lock:
+            last = self.probes.get(path)
+        if not probe and last is not None:
+            need_pull, error = (last[0] == remotes and last[1]), False
+        else:
+            if self.remote_probe == 'fetch':
+                need_pull, error = self.check_fetch_status(path)
+            else:
+                need_pull, error = self.check_pull_status(path)
+            if not error:
+                with self.lock:
+                    self.probes[path] = (remotes, need_pull)
+
+        # local branches behind their remote tracking branch can be pulled without asking the remote
+        for i in self.get_tracking(path).values():
+            if i['behind']:
+                need_pull = True
+        return need_pull, error
+
+    def get_tracking(self, path):
+        """
+        Ahead/behind of every local branch against its upstream on any remote, one
+        for-each-ref call per repo, cached until the refs or the upstreams change
+        :param path: os path of the repository
+        :return: {branch: {'sha', 'remote', 'remote_branch', 'ahead', 'behind', 'gone'}}
+        """
+        refs = self.refs.snapshot(path)
+        key = (tuple(sorted(refs.heads.items())), remotes_key(refs), tuple(sorted(refs.upstreams.items())))
+        with self.lock:
+            cached = self.tracking_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        ret = self.git(TRACKING_ARGS, path)
+        if ret.returncode != 0:
+            return {}
+        tracking = parse_tracking(ret.stdout)
+
+        # branches without configured upstream are compared with the same branch on origin
+        for branch, entry in tracking.items():
+            if entry['remote'] is None and branch in refs.remotes.get('origin', {}):
+                entry['remote'] = 'origin'
+                entry['remote_branch'] = branch
+                ret = self.git(['rev-list', '--left-right', '--count',
+                                f'refs/heads/{branch}...refs/remotes/origin/{branch}'], path)
+                counts = ret.stdout.split()
+                if ret.returncode == 0 and len(counts) == 2:
+                    entry['ahead'], entry['behind'] = int(counts[0]), int(counts[1])
+
+        with self.lock:
+            self.tracking_cache[path] = (key, tracking)
+        return tracking
+
+    def check_fetch_status(self, path):
+        """
+        Remote changes seen by a fetch dry run, on the upstream of any local branch
+        :return: (need_pull, error)
+        """
+        need_pull = False
+        ret = self.git(['fetch', '-v', '--dry-run'], path)
+        # print(ret.stderr)
+        ret = ret.stderr.splitlines()
+        if ret == []:
+            return False, True
+
+        refs = self.refs.snapshot(path)
+        tracked = set()
+        for branch in refs.heads:
+            upstream = refs.upstream(branch)
+            if upstream is not None:
+                tracked.add(f'{upstream[0]}/{upstream[1]}')
+
+        for i in ret:
+            i = re.sub(' +', ' ', i.strip())
+            i = i.split(' ')
+            if len(i) > 1 and i[-1] in tracked and i[0] != '=':
+                need_pull = True
+        return need_pull, False
+
+    def check_pull_status(self, path):
+        """
+        Compare the branches advertised by the remotes (ls-remote, nothing is downloaded)
+        with the remote tracking branches of every tracked local branch
+        :return: (need_pull, error)
+        """
+        refs = self.refs.snapshot(path)
+        tracked = {}
+        for branch in refs.heads:
+            upstream = refs.upstream(branch)
+            if upstream is not None:
+                remote, remote_branch = upstream
+                tracked.setdefault(remote, {})[remote_branch] = refs.remotes.get(remote, {}).get(remote_branch)
+
+        # nothing to compare with: an error only if there is no remote at all, like an empty fetch,
+        # a remote never fetched has no tracking branch yet
+        if len(tracked) == 0:
+            ret = self.git(['remote'], path)
+            return False, ret.returncode != 0 or ret.stdout.strip() == ''
+
+        need_pull = False
+        error = False
+        for remote, branches in tracked.items():
+            ret = self.git(['ls-remote', '--heads', remote] + list(branches), path)
+            if ret.returncode != 0:
+                error = True
+                continue
+            advertised = parse_ls_remote(ret.stdout)
+            for branch, sha in branches.items():
+                if branch in advertised and advertised[branch] != sha:
+                    need_pull = True
+        return need_pull, error
+
+    def check_push_status(self, path):
+        # print(f"check_push_status()")
+        # any local branch with commits not on its upstream, whatever the remote
+        for i in self.get_tracking(path).values():
+            if i['ahead']:
+                # print(f'repo {path} need to be updated! ---------------------------------------')
+                return True
+
+        return False
+
+    def check_commit_status(self, path):
+        """
+        Modified/deleted files are found by comparing the index stat data with the worktree,
+        git only look at the content of the entries the stat data can't decide, then the
+        staged files and the untracked files are asked, no git status walk the worktree again
+        :return: bool
+        """
+        scan = scan_worktree(path)
+        if scan is None or len(scan[1]) > MAX_AMBIGUOUS:
+            return self.check_work_status(path)
+        changed, ambiguous = scan
+        if len(self.filter_changes(changed)) > 0:
+            return True
+
+        checks = [(['-c', 'core.quotepath=off', 'diff-index', '--cached', '--name-only', '--no-renames', '-z',
+                    'HEAD'], False)]
+        if len(ambiguous) > 0:
+            # racy or touched files: git compare their content
+            checks.insert(0, (['-c', 'core.quotepath=off', '--literal-pathspecs', 'diff', '--name-only',
+                               '--no-renames', '-z', '--'] + ambiguous, False))
+        if self.untracked != 'no':
+            args = ['ls-files', '-o', '--exclude-standard', '-z']
+            if self.untracked == 'normal':
+                args += ['--directory', '--no-empty-directory']
+            checks.append((args, True))
+
+        for args, untracked in checks:
+            ret = self.git(args, path)
+            if ret.returncode != 0:
+                # ex: no commit yet, git status handle it
+                return self.check_work_status(path)
+            files = self.filter_changes(split_z(ret.stdout))
+            if untracked:
+                files = self.drop_hidden_dirs(path, files)
+            if len(files) > 0:
+                return True
+        return False
+
+    def check_work_status(self, path):
+        status = self.get_work_status(path)
+        return len(self.list_changes(path, status)) > 0 or len(self.list_cached_changes(path, status)) > 0
+
+    def get_work_status(self, path):
+        """
+        Changes, branch and ahead/behind of the current branch in one git call
+        :return: WorkStatus, empty if git failed
+        """
+        ret = self.git(STATUS_ARGS + [f'--untracked-files={self.untracked}'], path)
+        if ret.returncode != 0:
+            print(f"git status failed in {path}: {ret.stderr}")
+            return WorkStatus()
+        return parse_status(ret.stdout)
+
+    def list_changes(self, path, status=None):
+        """
+        Modified, deleted, conflicted and untracked files, filtered by the 'ignore' config
+        :param status: WorkStatus of the repo, read if None
+        :return: [file]
+        """
+        if status is None:
+            status = self.get_work_status(path)
+        changes = status.unstaged + status.conflicted + status.untracked
+        return self.drop_hidden_dirs(path, list(set(self.filter_changes(changes))))
+
+    def drop_hidden_dirs(self, path, changes):
+        """
+        Remove the untracked 'dir/' entries whose files are all hidden by the ignore filter,
+        all the dirs are listed by one git call
+        :param changes: [file]
+        :return: [file]
+        """
+        dirs = {i for i in changes if i.endswith('/')}
+        if len(dirs) == 0:
+            return changes
+        ret = self.git(untracked_args(*dirs), path)
+        if ret.returncode != 0:
+            return changes
+
+        # git report the top most untracked dirs, a file belong to only one of them
+        shown = set()
+        for file in self.filter_changes(split_z(ret.stdout)):
+            pos = file.find('/')
+            while pos >= 0:
+                if file[:pos + 1] in dirs:
+                    shown.add(file[:pos + 1])
+                    break
+                pos = file.find('/', pos + 1)
+        return [i for i in changes if not i.endswith('/') or i in shown]
+
+    def filter_changes(self, changes):
+        """
+        Remove the files hidden by the ignore filter
+        :param changes: [file]
+        :return: [file]
+        """
+        return self.ignore.filter(changes)
+
+    def list_untracked(self, path, folder):
+        """
+        Untracked files of a collapsed untracked dir
+        :param folder: 'dir/' entry of list_changes()
+        :return: [file]
+        """
+        ret = self.git(untracked_args(folder), path)
+        return self.filter_changes(split_z(ret.stdout))
+
+    def list_cached_changes(self, path, status=None):
+        """
+        Staged files, renamed ones by their new path
+        :param status: WorkStatus of the repo, read if None
+        :return: [file]
+        """
+        if status is None:
+            status = self.get_work_status(path)
+        return list(status.staged)
+
+
+def remotes_key(refs):
+    """
+    :param refs: Refs
+    :return: hashable state of the remote tracking branches
+    """
+    return tuple(sorted((remote, tuple(sorted(branches.items()))) for remote, branches in refs.remotes.items()))
+
+
+def untracked_args(*folders):
+    return ['--literal-pathspecs', 'ls-files', '-o', '--exclude-standard', '-z', '--'] + list(folders)
+
+
+def split_z(data):
+    """
+    Split a -z output
+    :return: [str]
+    """
+    out = data.split('\0')
+    if out[-1] == '':
+        out = out[:-1]
+    return out
@@ -0,0 +1,172 @@
+"""
+Headless scan: discover repositories and print their status, without Qt.
+
+    python3 main.py --scan [--json] [--workers N] [--cached] [--changes] [--branches] [--bench]
+                           [--trace FILE] [path ...]
+    python3 scan.py [--json] ...
+
+With --json one NDJSON record is printed per repo as soon as it is checked,
+--bench print startup and throughput timings on stderr, with the slowest repos and git
+commands, --trace write every git command run as a Chrome trace (ui.perfetto.dev).
+"""
+import time
+
+START = time.perf_counter()
+
+import os
+import sys
+import json
+import argparse
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import discovery
+from config import load_config
+from gitcmd import GitEngine
+from gittrace import CommandTrace
+from ignorefilter import IgnoreFilter
+from refs import RefStore
+from repostatus import RepoStatus
+from statuscache import StatusCache
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='main.py --scan', description='GitHUD headless scan')
+    parser.add_argument('path', nargs='*', help='roots to scan, default: path of user.conf')
+    parser.add_argument('--json', action='store_true', help='one NDJSON record per repo')
+    parser.add_argument('--workers', type=int, default=None, help='repos checked in parallel')
+    parser.add_argument('--cached', action='store_true', help='reuse the GUI status cache (status_cache config) '
+                                                                'for unchanged repos')
+    parser.add_argument('--changes', action='store_true', help='add the changed files to each record')
+    parser.add_argument('--branches', action='store_true', help='add ahead/behind of each local branch')
+    parser.add_argument('--bench', action='store_true', help='print timings on stderr')
+    parser.add_argument('--trace', default=None, metavar='FILE', help='write a Chrome trace of the git commands')
+    return parser.parse_args(argv)
+
+
+def check(repo_status, path, cached, changes, branches):
+    start = time.perf_counter()
+    if cached:
+        status = repo_status.get_cached_status(path)
+    else:
+        status = repo_status.get_status(path)
+
+    record = {'path': path, 'name': os.path.basename(path)}
+    record.update(status)
+    if changes:
+        work = repo_status.get_work_status(path)
+        record['changes'] = sorted(repo_status.list_changes(path, work), key=str.lower)
+        record['cached_changes'] = sorted(repo_status.list_cached_changes(path, work), key=str.lower)
+        record['renamed'] = work.renamed
+        record['conflicted'] = sorted(work.conflicted, key=str.lower)
+    if branches:
+        record['branches'] = repo_status.get_tracking(path)
+    record['time'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+def error_record(path, e):
+    """
+    Record of a repo whose check raised, the scan go on with the other repos
+    """
+    return {'path': path, 'name': os.path.basename(path), 'need_pull': False, 'need_push': False,
+            'need_commit': False, 'error': True, 'message': str(e) or type(e).__name__, 'time': None}
+
+
+def print_record(record, as_json):
+    if as_json:
+        print(json.dumps(record), flush=True)
+        return
+
+    flags = []
+    for key in ['error', 'need_pull', 'need_push', 'need_commit']:
+        if record[key]:
+            flags.append(key)
+    if len(flags) == 0:
+        flags.append('ok')
+    lines = [f"{record['path']}: {', '.join(flags)}"]
+    if 'message' in record:
+        lines.append(f"    {record['message']}")
+    # --changes
+    for i in record.get('cached_changes', []):
+        if i in record.get('renamed', {}):
+            lines.append(f"    staged   {record['renamed'][i]} -> {i}")
+        else:
+            lines.append(f"    staged   {i}")
+    for i in record.get('changes', []):
+        lines.append(f"    {'conflict' if i in record.get('conflicted', []) else 'changed ':<8} {i}")
+    print('\n'.join(lines), flush=True)
+
+
+def main(argv):
+    args = parse_args(argv)
+    config = load_config()
+    workers = args.workers or max(1, int(config.get('workers', 8)))
+    roots = args.path or config['path']
+
+    for i in roots:
+        if not os.path.exists(i):
+            print(f"path {i} dont exist", file=sys.stderr)
+            return 2
+
+    trace = CommandTrace()
+    engine = GitEngine(max_jobs=workers, trace=trace)
+    cache = None
+    if args.cached:
+        # same file as the GUI
+        cache = StatusCache(config.get('status_cache', os.fspath(Path(__file__).resolve().parent / "status_cache.json")))
+    repo_status = RepoStatus(engine.run, RefStore(), IgnoreFilter.from_config(config), cache,
+                             config.get('remote_probe', 'ls-remote'), config.get('untracked_files', 'normal'))
+    startup = time.perf_counter() - START
+
+    start = time.perf_counter()
+    repos = discovery.find_repos(roots, exclude=config.get('exclude', discovery.EXCLUDE),
+                                 max_depth=config.get('max_depth', None),
+                                 nested=config.get('nested_repos', False), workers=workers)
+    paths = [path for i in repos.values() for path in i]
+    discovery_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    times = []
+    errors = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(check, repo_status, i, args.cached, args.changes, args.branches): i for i in paths}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+                times.append(record['time'])
+            except Exception as e:
+                record = error_record(futures[future], e)
+            if record['error']:
+                errors += 1
+            print_record(record, args.json)
+    scan_time = time.perf_counter() - start
+
+    if cache is not None:
+        cache.save()
+    engine.stop()
+
+    if args.bench:
+        bench = {
+            'startup': round(startup, 4),
+            'qt_imported': 'PySide2' in sys.modules,
+            'repos': len(paths),
+            'discovery': round(discovery_time, 4),
+            'scan': round(scan_time, 4),
+            'repos_per_s': round(len(paths) / scan_time, 2) if scan_time > 0 else None,
+            'repo_mean': round(sum(times) / len(times), 4) if times else None,
+            'repo_max': round(max(times), 4) if times else None,
+            'workers': workers,
+        }
+        print(json.dumps(bench), file=sys.stderr)
+        print(trace.summary(), file=sys.stderr)
+    if args.trace is not None:
+        count = trace.export_chrome(args.trace)
+        print(f"{count} git commands traced in {args.trace}", file=sys.stderr)
+
+    return 1 if errors > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,237 @@
+import heapq
+import threading
+
+from concurrent.futures import CancelledError
+
+# priority levels, lower first
+SELECTED = 0  # repo shown in the change pane
+VISIBLE = 1  # repo row visible in the folder tree
+BACKGROUND = 2  # everything else
+
+# check modes, a higher one include the lower ones
+CACHED = 0  # worktree checked, remote part cached if the repo refs did not change
+LOCAL = 1  # everything checked again but the remotes, for the changes seen by the watcher
+REMOTE = 2  # remotes asked again, ref derived part cached if the repo did not change
+FULL = 3  # everything checked again
+
+ERROR_STATUS = {'need_pull': False, 'need_push': False, 'need_commit': False, 'error': True}
+
+
+class Job:
+    __slots__ = ['path', 'level', 'force', 'stamp', 'running', 'cancelled', 'again']
+
+    def __init__(self, path, level, force):
+        self.path = path
+        self.level = level  # requested level, the effective one also depend on focus/visibility
+        self.force = force  # CACHED, LOCAL, REMOTE or FULL
+        self.stamp = 0  # heap entries with an older stamp are stale
+        self.running = False
+        self.cancelled = False
+        self.again = None  # (level, force) of a request superseding the running check
+
+
+class StatusScheduler:
+    """
+    Repo status checks served by priority: the selected repo, then the repos visible in the
+    tree, then the others. There is at most one job per repo, a new request for a queued repo
+    only raise its priority/mode, a request for a running repo with a higher mode, or FULL,
+    cancel the running check (its git commands are killed) and queue it again, with an other
+    mode than CACHED the repo is checked again once the running check end: it may have
+    changed after the check looked at it.
+
+    One worker only take SELECTED/VISIBLE jobs, so the repo looked at never wait behind a
+    full scan. Nothing here touch Qt.
+    """
+
+    def __init__(self, check, done, workers=8, cancel=None, idle=None):
+        """
+        :param check: callable(path, mode) => status dict, called from the workers
+        :param done: callable(path, status), called from the workers with each result
+        :param cancel: optional callable(path, thread name) killing the git commands a worker run for a repo
+        :param idle: optional callable() called when the last job end
+        """
+        self.check = check
+        self.done = done
+        self.cancel = cancel
+        self.idle = idle
+
+        self.jobs = {}  # path => Job, queued or running
+        self.heap = []  # (effective level, seq, stamp, path)
+        self.seq = 0
+        self.focus = None
+        self.visible = set()
+        self.stopped = False
+        self.cond = threading.Condition()
+
+        self.threads = []
+        for i in range(workers + 1):
+            # the last worker is kept for the repos looked at
+            thread = threading.Thread(target=self.work, args=(i == workers,), name=f'StatusWorker-{i}',
+                                      daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def request(self, path, level=BACKGROUND, force=CACHED):
+        """
+        Queue a status check, can be called from any thread
+        :param level: SELECTED, VISIBLE or BACKGROUND
+        :param force: check mode, CACHED, LOCAL, REMOTE or FULL
+        """
+        with self.cond:
+            self._request(path, level, force)
+            self.cond.notify_all()
+
+    def request_many(self, paths, level=BACKGROUND, force=CACHED):
+        with self.cond:
+            for i in paths:
+                self._request(i, level, force)
+            self.cond.notify_all()
+
+    def _request(self, path, level, force):
+        if self.stopped:
+            return
+        job = self.jobs.get(path)
+        if job is None:
+            job = Job(path, level, force)
+            self.jobs[path] = job
+            self.push(job)
+        elif job.running:
+            if not job.cancelled and (force == FULL or force > job.force):
+                # the running check is stale, its result is dropped and the repo checked again
+                job.cancelled = True
+                if self.cancel is not None:
+                    self.cancel(path, job.running)
+            if job.again is not None:
+                job.again = (min(level, job.again[0]), max(force, job.again[1]))
+            elif job.cancelled or force != CACHED:
+                job.again = (level, force)
+        elif level < job.level or force > job.force:
+            job.level = min(level, job.level)
+            job.force = max(force, job.force)
+            self.push(job)
+
+    def stop(self):
+        """
+        Drop the queued checks and cancel the running ones, later requests are ignored and
+        the workers exit, join() return once the running checks are unwound
+        """
+        with self.cond:
+            self.stopped = True
+            self.heap.clear()
+            for path, job in list(self.jobs.items()):
+                if not job.running:
+                    del self.jobs[path]
+                elif not job.cancelled:
+                    job.cancelled = True
+                    if self.cancel is not None:
+                        self.cancel(path, job.running)
+            self.cond.notify_all()
+
+    def set_focus(self, path):
+        """
+        :param path: selected repo, its queued check jump to the front
+        """
+        with self.cond:
+            old = self.focus
+            self.focus = path
+            for i in (old, path):
+                self.update(i)
+            self.cond.notify_all()
+
+    def set_visible(self, paths):
+        """
+        :param paths: repos visible in the tree, queued checks of the repos that left the view
+                      go back to the background
+        """
+        paths = set(paths)
+        with self.cond:
+            changed = self.visible ^ paths
+            self.visible = paths
+            for i in changed:
+                self.update(i)
+            self.cond.notify_all()
+
+    def level(self, job):
+        level = job.level
+        if job.path == self.focus:
+            return SELECTED
+        if job.path in self.visible:
+            level = min(level, VISIBLE)
+        return level
+
+    def update(self, path):
+        job = self.jobs.get(path)
+        if job is not None and not job.running:
+            self.push(job)
+
+    def push(self, job):
+        # the previous heap entry of the job become stale
+        job.stamp += 1
+        self.seq += 1
+        heapq.heappush(self.heap, (self.level(job), self.seq, job.stamp, job.path))
+
+    def pop(self, reserved):
+        """
+        :param reserved: only take SELECTED/VISIBLE jobs
+        :return: Job or None
+        """
+        heap = self.heap
+        while heap:
+            level, _, stamp, path = heap[0]
+            job = self.jobs.get(path)
+            if job is None or job.running or job.stamp != stamp:
+                heapq.heappop(heap)
+                continue
+            if reserved and level == BACKGROUND:
+                return None
+            heapq.heappop(heap)
+            return job
+        return None
+
+    def work(self, reserved):
+        name = threading.current_thread().name
+        while True:
+            with self.cond:
+                job = self.pop(reserved)
+                while job is None:
+                    if self.stopped:
+                        return
+                    self.cond.wait()
+                    job = self.pop(reserved)
+                job.running = name
+                force = job.force
+
+            try:
+                status = self.check(job.path, force)
+            except CancelledError:
+                status = None
+            except Exception as e:
+                print(f"cannot check {job.path}: {e}")
+                status = dict(ERROR_STATUS)
+
+            with self.cond:
+                if job.cancelled:
+                    status = None
+                del self.jobs[job.path]
+                if job.again is not None:
+                    level, force = job.again
+                    self._request(job.path, level, force)
+                idle = len(self.jobs) == 0
+                self.cond.notify_all()
+
+            if status is not None:
+                self.done(job.path, status)
+            if idle and self.idle is not None:
+                self.idle()
+
+    @property
+    def pending(self):
+        return len(self.jobs)
+
+    def join(self, timeout=None):
+        """
+        Wait until no check is queued or running
+        :return: False on timeout
+        """
+        with self.cond:
+            return self.cond.wait_for(lambda: len(self.jobs) == 0, timeout)
@@ -0,0 +1,105 @@
+import os
+import json
+import hashlib
+import threading
+
+
+class StatusCache:
+    """
+    Repositories status saved on disk between two launches.
+
+    Each entry is keyed by the repo os path and store the fingerprint of the repo
+    at check time, a status is only reused while the fingerprint don't change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        self.lock = threading.Lock()
+        # one writer at a time for the .tmp file, self.lock is not held during the write
+        self.save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"cannot load status cache: {e}")
+            self.data = {}
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                data = json.dumps(self.data)
+            tmp = self.path + '.tmp'
+            try:
+                with open(tmp, 'w') as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"cannot save status cache: {e}")
+
+    def get(self, repo, fingerprint=None):
+        """
+        :param repo: repo os path
+        :param fingerprint: if not None, the status is returned only if fingerprint match
+        :return: status dict or None
+        """
+        with self.lock:
+            entry = self.data.get(repo)
+        if entry is None:
+            return None
+        if fingerprint is not None and entry['fingerprint'] != fingerprint:
+            return None
+        return entry['status']
+
+    def set(self, repo, fingerprint, status):
+        with self.lock:
+            self.data[repo] = {'fingerprint': fingerprint, 'status': status}
+
+    def remove(self, repo):
+        with self.lock:
+            self.data.pop(repo, None)
+
+
+def stat_entry(path, name):
+    try:
+        st = os.stat(path)
+        return [name, st.st_mtime_ns, st.st_size]
+    except OSError:
+        return [name, None, None]
+
+
+def fingerprint(repo):
+    """
+    Fingerprint of the state git keep in .git: HEAD, loose refs, packed-refs and index
+    mtime/size, only stat() calls, no file is read
+    :param repo: repo os path
+    :return: hex str
+    """
+    git_dir = os.path.join(repo, '.git')
+    out = []
+    for i in ['HEAD', 'packed-refs', 'index']:
+        out.append(stat_entry(os.path.join(git_dir, i), i))
+
+    stack = [os.path.join(git_dir, 'refs')]
+    refs = []
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        st = entry.stat(follow_symlinks=False)
+                        refs.append([os.path.relpath(entry.path, git_dir), st.st_mtime_ns, st.st_size])
+        except OSError:
+            continue
+    refs.sort()
+    out += refs
+
+    return hashlib.sha1(repr(out).encode()).hexdigest()
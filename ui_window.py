@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+################################################################################
+## Compiled form of window.ui, imported at startup instead of parsing the .ui
+## file with QUiLoader.
+##
+## After editing window.ui in Qt Designer regenerate it with:
+##     pyside2-uic window.ui -o ui_window.py
+################################################################################
+
+from PySide2.QtCore import QCoreApplication, QMetaObject, QRect, Qt
+from PySide2.QtWidgets import QComboBox, QLabel, QLineEdit, QProgressBar, QPushButton, QTreeView, QWidget
+
+
+class Ui_window(object):
+    def setupUi(self, window):
+        if not window.objectName():
+            window.setObjectName(u"window")
+        window.resize(290, 700)
+        window.setMouseTracking(True)
+        self.combo_merge = QComboBox(window)
+        self.combo_merge.setObjectName(u"combo_merge")
+        self.combo_merge.setGeometry(QRect(150, 630, 131, 25))
+
+        self.b_commit = QPushButton(window)
+        self.b_commit.setObjectName(u"b_commit")
+        self.b_commit.setGeometry(QRect(100, 600, 61, 25))
+
+        self.b_pull = QPushButton(window)
+        self.b_pull.setObjectName(u"b_pull")
+        self.b_pull.setGeometry(QRect(225, 280, 25, 25))
+
+        self.b_merge = QPushButton(window)
+        self.b_merge.setObjectName(u"b_merge")
+        self.b_merge.setGeometry(QRect(10, 630, 91, 25))
+
+        self.combo_branch = QComboBox(window)
+        self.combo_branch.setObjectName(u"combo_branch")
+        self.combo_branch.setGeometry(QRect(70, 280, 150, 25))
+
+        self.b_commit_push = QPushButton(window)
+        self.b_commit_push.setObjectName(u"b_commit_push")
+        self.b_commit_push.setGeometry(QRect(165, 600, 61, 25))
+
+        self.msg = QLineEdit(window)
+        self.msg.setObjectName(u"msg")
+        self.msg.setGeometry(QRect(10, 570, 271, 25))
+
+        self.label = QLabel(window)
+        self.label.setObjectName(u"label")
+        self.label.setGeometry(QRect(10, 660, 271, 31))
+        self.label.setMouseTracking(True)
+
+        self.tree = QTreeView(window)
+        self.tree.setObjectName(u"tree")
+        self.tree.setGeometry(QRect(10, 331, 271, 231))
+        self.tree.setContextMenuPolicy(Qt.NoContextMenu)
+        self.tree.setProperty("showDropIndicator", False)
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.header().setVisible(False)
+
+        self.b_ignore = QPushButton(window)
+        self.b_ignore.setObjectName(u"b_ignore")
+        self.b_ignore.setGeometry(QRect(230, 600, 51, 25))
+
+        self.label_2 = QLabel(window)
+        self.label_2.setObjectName(u"label_2")
+        self.label_2.setGeometry(QRect(110, 631, 41, 20))
+
+        self.b_push = QPushButton(window)
+        self.b_push.setObjectName(u"b_push")
+        self.b_push.setGeometry(QRect(257, 280, 25, 25))
+
+        self.b_update = QPushButton(window)
+        self.b_update.setObjectName(u"b_update")
+        self.b_update.setGeometry(QRect(40, 280, 25, 25))
+
+        self.b_delete = QPushButton(window)
+        self.b_delete.setObjectName(u"b_delete")
+        self.b_delete.setGeometry(QRect(10, 280, 25, 25))
+
+        self.progress = QProgressBar(window)
+        self.progress.setObjectName(u"progress")
+        self.progress.setGeometry(QRect(10, 660, 271, 31))
+        self.progress.setValue(0)
+        self.progress.setTextVisible(False)
+
+        self.folder_tree = QTreeView(window)
+        self.folder_tree.setObjectName(u"folder_tree")
+        self.folder_tree.setGeometry(QRect(10, 40, 271, 231))
+
+        self.update_tree = QPushButton(window)
+        self.update_tree.setObjectName(u"update_tree")
+        self.update_tree.setGeometry(QRect(10, 10, 25, 25))
+
+        self.b_reset = QPushButton(window)
+        self.b_reset.setObjectName(u"b_reset")
+        self.b_reset.setGeometry(QRect(70, 600, 25, 25))
+
+        self.b_clean = QPushButton(window)
+        self.b_clean.setObjectName(u"b_clean")
+        self.b_clean.setGeometry(QRect(40, 600, 25, 25))
+
+        self.b_delete_file = QPushButton(window)
+        self.b_delete_file.setObjectName(u"b_delete_file")
+        self.b_delete_file.setGeometry(QRect(10, 600, 25, 25))
+
+        self.b_extend = QPushButton(window)
+        self.b_extend.setObjectName(u"b_extend")
+        self.b_extend.setGeometry(QRect(257, 10, 25, 25))
+
+        self.label_repo = QLabel(window)
+        self.label_repo.setObjectName(u"label_repo")
+        self.label_repo.setGeometry(QRect(10, 310, 271, 20))
+        self.label_repo.setAlignment(Qt.AlignCenter)
+
+        self.retranslateUi(window)
+
+        QMetaObject.connectSlotsByName(window)
+    # setupUi
+
+    def retranslateUi(self, window):
+        window.setWindowTitle(QCoreApplication.translate("window", u"Form", None))
+        window.setWhatsThis("")
+        self.b_commit.setText(QCoreApplication.translate("window", u"Commit", None))
+        self.b_pull.setText("")
+        self.b_merge.setText(QCoreApplication.translate("window", u"Merge", None))
+        self.b_commit_push.setText(QCoreApplication.translate("window", u"C + Push", None))
+        self.label.setText("")
+        self.b_ignore.setText(QCoreApplication.translate("window", u"Ignore", None))
+        self.label_2.setText(QCoreApplication.translate("window", u"From", None))
+        self.b_push.setText("")
+        self.b_update.setText("")
+        self.b_delete.setText("")
+        self.update_tree.setText("")
+        self.b_reset.setText("")
+        self.b_clean.setText("")
+        self.b_delete_file.setText("")
+        self.b_extend.setText("")
+        self.label_repo.setText("")
+    # retranslateUi
+
+
+class Window(QWidget, Ui_window):
+    """
+    Main form, widgets are attributes like with QUiLoader
+    """
+
+    def __init__(self, parent=None):
+        QWidget.__init__(self, parent)
+        self.setupUi(self)
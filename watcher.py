@@ -0,0 +1,194 @@
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+
+EVENT = struct.Struct('iIII')
+
+# never watched in working trees
+SKIP = {'.git', 'node_modules', '__pycache__', 'venv', '.venv'}
+
+
+def load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+libc = load_libc()
+
+
+class RepoWatcher:
+    """
+    Watch repositories with inotify and report the ones that changed.
+
+    For each repo the .git dir (HEAD, index, packed-refs), the refs dirs and, if
+    worktree is True, every dir of the working tree are watched. Events are
+    debounced: callback(paths) is called from the watcher thread with the repos
+    that got no new event for delay seconds.
+    """
+
+    def __init__(self, callback, delay=1.0, worktree=True, max_watches=50000):
+        self.callback = callback
+        self.delay = delay
+        self.worktree = worktree
+        self.max_watches = max_watches
+
+        self.fd = None
+        self.watches = {}  # wd => (repo, dir)
+        self.to_add = []
+        self.pending = {}  # repo => time of last event
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    @staticmethod
+    def available():
+        return libc is not None
+
+    def start(self):
+        if not self.available():
+            return False
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            print(f"inotify_init1 fail: {os.strerror(ctypes.get_errno())}")
+            return False
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='RepoWatcher', daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def watch(self, repos):
+        """
+        Add repositories to watch, dirs are listed in the watcher thread
+        :param repos: [repo os path]
+        """
+        with self.lock:
+            self.to_add += repos
+
+    def add_watch(self, repo, path):
+        if len(self.watches) >= self.max_watches:
+            return False
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(path), MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = (repo, path)
+        return True
+
+    def add_tree(self, repo, path):
+        stack = [path]
+        while stack:
+            folder = stack.pop()
+            if not self.add_watch(repo, folder):
+                return
+            try:
+                with os.scandir(folder) as it:
+                    for entry in it:
+                        if entry.name in SKIP or not entry.is_dir(follow_symlinks=False):
+                            continue
+                        # nested repo, it has its own watches
+                        if os.path.isdir(os.path.join(entry.path, '.git')):
+                            continue
+                        stack.append(entry.path)
+            except OSError:
+                continue
+
+    def add_repo(self, repo):
+        git_dir = os.path.join(repo, '.git')
+        self.add_watch(repo, git_dir)
+        self.add_tree(repo, os.path.join(git_dir, 'refs'))
+        if self.worktree:
+            self.add_tree(repo, repo)
+
+    def run(self):
+        while self.running:
+            with self.lock:
+                to_add = self.to_add
+                self.to_add = []
+            for i in to_add:
+                self.add_repo(i)
+
+            timeout = 0.2
+            if self.pending:
+                oldest = min(self.pending.values())
+                timeout = max(0.0, min(timeout, oldest + self.delay - time.monotonic()))
+
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if readable:
+                self.read_events()
+
+            now = time.monotonic()
+            ready = [repo for repo, t in self.pending.items() if now - t >= self.delay]
+            if ready:
+                for i in ready:
+                    del self.pending[i]
+                self.callback(ready)
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+
+        now = time.monotonic()
+        i = 0
+        while i < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, i)
+            name = data[i + EVENT.size: i + EVENT.size + length].rstrip(b'\0').decode(errors='replace')
+            i += EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # events lost, everything may have changed
+                for repo, _ in list(self.watches.values()):
+                    self.pending[repo] = now
+                continue
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+
+            if wd not in self.watches:
+                continue
+            repo, folder = self.watches[wd]
+
+            # git lock files come and go around each write
+            if name.endswith('.lock'):
+                continue
+
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and name not in SKIP:
+                if folder != os.path.join(repo, '.git'):
+                    self.add_tree(repo, os.path.join(folder, name))
+
+            self.pending[repo] = now